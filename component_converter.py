@@ -1,9 +1,16 @@
+import argparse
+import ast
+import hashlib
+import importlib
+import json
 import pathlib
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy
 import photonforge as pf
+from scipy.spatial import cKDTree
 
 sys.path.append("./si")
 sys.path.append("./sin")
@@ -69,46 +76,379 @@ _component_data = {
 """,
 }
 
-for family, preamble in preambles.items():
-    lines = []
-    technology = siepic_sin.ebeam() if family == "sin" else siepic_si.ebeam()
-    mod_name = "siepic_forge" if family == "si" else f"siepic_{family}_forge"
-    path = pathlib.Path(f"{family}/{mod_name}/library")
-    for gds_name in sorted(path.glob("*.gds")):
-        components = pf.load_layout(gds_name, technology=technology)
-        for comp_name in sorted(c.name for c in pf.find_top_level(*components.values())):
-            comp = components[comp_name]
-            if comp.name[0] == "$":
+
+def detect_pin_ports(comp, pins, technology, tolerance=0.005):
+    """Detect the ports at all pins of a component in a single pass.
+
+    Ports are detected once for all port specs within the pins' bounding box. Each pin is then
+    matched to the detected port centers through a KD-tree, so the number of geometry queries
+    does not grow with the number of pins and specs.
+
+    Returns:
+        List with the ``(center, direction, spec_name)`` candidates for each pin, sorted in the
+        technology port spec order.
+    """
+    result = [[] for _ in pins]
+    if len(pins) == 0:
+        return result
+
+    pins = numpy.array(pins)
+    spec_names = list(technology.ports)
+    specs = [technology.ports[name] for name in spec_names]
+    ports = comp.detect_ports(
+        spec_names, (pins.min(axis=0) - tolerance, pins.max(axis=0) + tolerance)
+    )
+    if len(ports) == 0:
+        return result
+
+    centers = numpy.array([port.center for port in ports])
+    index = cKDTree(centers)
+    for i, candidates in enumerate(index.query_ball_point(pins, tolerance)):
+        if len(candidates) == 0:
+            continue
+        candidates = numpy.array(candidates)
+        matches = numpy.isclose(centers[candidates], pins[i]).all(axis=1)
+        pin = tuple(float(x) for x in pins[i])
+        found = []
+        for j in candidates[matches]:
+            port = ports[j]
+            k = next(k for k, spec in enumerate(specs) if spec == port.spec)
+            found.append((k, (pin, int(port.input_direction), spec_names[k])))
+        result[i] = [candidate for _, candidate in sorted(found)]
+    return result
+
+
+def _transform_point(point, center, rotation, x_reflection):
+    x = point[0] - center[0]
+    y = -(point[1] - center[1]) if x_reflection else point[1] - center[1]
+    c, s = {0: (1, 0), 90: (0, 1), 180: (-1, 0), 270: (0, -1)}[rotation]
+    return (c * x - s * y + center[0], s * x + c * y + center[1])
+
+
+def _symmetric_geometry(structures, center, rotation, x_reflection, area_tolerance):
+    for layer_structures in structures.values():
+        transformed = [
+            s.copy()
+            .translate((-center[0], -center[1]))
+            .transform(rotation=rotation, x_reflection=x_reflection)
+            .translate(center)
+            for s in layer_structures
+        ]
+        area = sum(p.area() for p in pf.boolean(layer_structures, [], "+"))
+        difference = sum(
+            p.area() for p in pf.boolean(layer_structures, transformed, "^")
+        )
+        if difference > area_tolerance * area:
+            return False
+    return True
+
+
+def detect_port_symmetries(
+    comp, ports, technology, tolerance=0.005, area_tolerance=1e-3
+):
+    """Detect mirror and rotation symmetries of a cell that exchange its ports.
+
+    The candidates are the 4 mirrors and 3 rotations (multiples of 90°) around the center of the
+    port bounding box. A candidate is accepted when it maps every port onto a port with the same
+    spec and direction and leaves the geometry in all simulated layers unchanged. Only cells with
+    single-mode planar ports are considered.
+
+    Returns:
+        List of port symmetries in the explicit form ``(src1, src2, {dst1: dst2})``, so that only
+        one source per port orbit needs to be simulated.
+    """
+    if len(ports) < 2 or any(
+        len(p) != 3 or isinstance(p[1], tuple) or technology.ports[p[2]].num_modes != 1
+        for p in ports
+    ):
+        return []
+
+    names = [f"P{i}" for i in range(len(ports))]
+    centers = numpy.array([p[0] for p in ports])
+    center = tuple((centers.min(axis=0) + centers.max(axis=0)) / 2)
+    sim_layers = set().union(
+        *(e.mask_spec.get_layers() for e in technology.extrusion_specs)
+    )
+    structures = {
+        layer: layer_structures
+        for layer, layer_structures in comp.get_structures().items()
+        if layer in sim_layers and len(layer_structures) > 0
+    }
+
+    permutations = []
+    for x_reflection in (False, True):
+        for rotation in (0, 90, 180, 270):
+            if rotation == 0 and not x_reflection:
                 continue
-            comp.remap_layers({(1, 99): (1, 0)})
-            fibers = [
-                tuple(float(x) for x in numpy.round((s.x_mid, s.y_mid), decimals=3))
-                for s in comp.structures.get((81, 0), [])
-            ]
-            pins = [
-                numpy.round((s.x_mid, s.y_mid), decimals=3)
-                for s in comp.structures.get((1, 10), [])
-            ]
-            ports = []
-            for pin in pins:
-                candidates = []
-                for spec in technology.ports:
-                    for port in comp.detect_ports([spec], (pin - 0.005, pin + 0.005)):
-                        if numpy.allclose(port.center, pin):
-                            candidates.append(
-                                (tuple(float(x) for x in pin), int(port.input_direction), spec)
-                            )
-                if len(candidates) == 0:
-                    print(f"# WARN: Missing port {tuple(float(x) for x in pin)}.")
-                ports.extend(candidates)
-            ports.extend((tuple(c),) for c in fibers)
-
-            ports = ", ".join(repr(p) for p in ports)
-
-            model = "None" if len(ports) < 2 or comp.name.endswith("BB") else "{}"
-
-            lines.append(f"{comp.name!r}: ({gds_name.stem!r}, [{ports}], {model}),")
-
-    output = pathlib.Path(__file__).parent / family / mod_name / "_component_data.py"
-    output.write_text(preamble + "\n".join(lines) + "\n}")
-    subprocess.run(["ruff", "format", output], check=True)
+            permutation = []
+            for position, direction, spec in ports:
+                target = _transform_point(position, center, rotation, x_reflection)
+                target_direction = (
+                    (-direction if x_reflection else direction) + rotation
+                ) % 360
+                match = [
+                    j
+                    for j, p in enumerate(ports)
+                    if p[2] == spec
+                    and p[1] % 360 == target_direction
+                    and numpy.allclose(p[0], target, atol=tolerance)
+                ]
+                if len(match) != 1:
+                    break
+                permutation.append(match[0])
+            if (
+                len(permutation) == len(ports)
+                and permutation != list(range(len(ports)))
+                and permutation not in permutations
+                and _symmetric_geometry(
+                    structures, center, rotation, x_reflection, area_tolerance
+                )
+            ):
+                permutations.append(permutation)
+
+    # Each source is derived from the first port in its orbit
+    result = []
+    derived = set()
+    for i in range(len(ports)):
+        if i in derived:
+            continue
+        for permutation in permutations:
+            j = permutation[i]
+            if j == i or j in derived:
+                continue
+            derived.add(j)
+            mapping = {
+                names[k]: names[permutation[k]] for k in range(len(ports)) if k != i
+            }
+            result.append((names[i], names[j], mapping))
+    return result
+
+
+def cell_digest(comp):
+    """Content hash of a cell, including its dependencies."""
+    digest = hashlib.sha256()
+    for c in [comp, *sorted(comp.dependencies(), key=lambda c: c.name)]:
+        digest.update(repr((c.name, c.structures, c.references)).encode())
+    return digest.hexdigest()
+
+
+def scan_library(family, gds_name, known_cells, curated, thumbnails):
+    """Generate the component data entries for all cells in a library file.
+
+    Cells with the same content hash as in ``known_cells`` are not scanned again. Entries use
+    the curated ports in ``curated`` for cells already listed in the component data, as long as
+    they still match the layout, or the detected ports otherwise. Port symmetries are detected
+    on the curated ports, or on the detected ones when every pin has a single candidate.
+    Thumbnails of listed cells are taken from ``thumbnails``.
+
+    Returns:
+        Dictionary with the hash, entry line, detected model and warnings for each cell, sorted
+        by name.
+    """
+    technology = siepic_sin.ebeam() if family == "sin" else siepic_si.ebeam()
+    components = pf.load_layout(gds_name, technology=technology)
+    cells = {}
+    for comp_name in sorted(c.name for c in pf.find_top_level(*components.values())):
+        comp = components[comp_name]
+        if comp.name[0] == "$":
+            continue
+        comp.remap_layers({(1, 99): (1, 0)})
+
+        digest = cell_digest(comp)
+        known = known_cells.get(comp_name)
+        if known is not None and known["hash"] == digest:
+            cells[comp_name] = known
+            continue
+
+        fibers = [
+            tuple(float(x) for x in numpy.round((s.x_mid, s.y_mid), decimals=3))
+            for s in comp.structures.get((81, 0), [])
+        ]
+        pins = [
+            numpy.round((s.x_mid, s.y_mid), decimals=3)
+            for s in comp.structures.get((1, 10), [])
+        ]
+        ports = []
+        warnings = []
+        unique = True
+        for pin, candidates in zip(
+            pins, detect_pin_ports(comp, pins, technology), strict=True
+        ):
+            if len(candidates) == 0:
+                warnings.append(f"# WARN: Missing port {tuple(float(x) for x in pin)}.")
+            unique = unique and len(candidates) == 1
+            ports.extend(candidates)
+        ports.extend((tuple(c),) for c in fibers)
+
+        final_ports = curated.get(comp_name)
+        if final_ports is not None:
+            detected = {(p[0], p[1] % 360, p[2]) for p in ports if len(p) == 3}
+            if any(
+                (tuple(p[0]), p[1] % 360, p[2]) not in detected
+                for p in final_ports
+                if len(p) == 3 and not isinstance(p[1], tuple)
+            ):
+                warnings.append(
+                    f"# WARN: Curated ports of {comp_name} do not match the layout. "
+                    "Using the detected ports."
+                )
+                final_ports = None
+        if final_ports is not None:
+            ports = final_ports
+        elif unique:
+            final_ports = ports
+        else:
+            final_ports = []
+
+        symmetries = detect_port_symmetries(comp, final_ports, technology)
+        ports = ", ".join(repr(p) for p in ports)
+        thumbnail = thumbnails.get(comp_name, "")
+
+        if len(ports) < 2 or comp.name.endswith("BB"):
+            model = "None"
+        elif len(symmetries) > 0:
+            model = repr({"port_symmetries": symmetries})
+        else:
+            model = "{}"
+
+        cells[comp_name] = {
+            "hash": digest,
+            "line": f"{comp.name!r}: "
+            f"({pathlib.Path(gds_name).stem!r}, [{ports}], {model}, {thumbnail!r}),",
+            "model": model,
+            "warnings": warnings,
+            "rescanned": True,
+        }
+    return cells
+
+
+def existing_entries(path):
+    """Source code for the current entries in a component data file."""
+    if not path.is_file():
+        return {}
+    source = path.read_text()
+    for node in ast.parse(source).body:
+        if (
+            isinstance(node, ast.Assign)
+            and isinstance(node.targets[0], ast.Name)
+            and node.targets[0].id == "_component_data"
+            and isinstance(node.value, ast.Dict)
+        ):
+            return {
+                ast.literal_eval(k): f"{ast.get_source_segment(source, k)}: "
+                f"{ast.get_source_segment(source, v)},"
+                for k, v in zip(node.value.keys, node.value.values, strict=True)
+            }
+    return {}
+
+
+def with_model(entry, model):
+    """Replace an empty model in a curated entry with the detected one."""
+    node = ast.parse("{" + entry + "}", mode="eval").body
+    source = "{" + entry + "}"
+    values = node.values[0].elts
+    if model in ("None", "{}") or not (
+        isinstance(values[2], ast.Dict) and not values[2].keys
+    ):
+        return entry
+    segments = [ast.get_source_segment(source, v) for v in values]
+    segments[2] = model
+    return f"{ast.get_source_segment(source, node.keys[0])}: ({', '.join(segments)}),"
+
+
+def merge_entries(cells, entries):
+    """Entry lines for the cells of a library file.
+
+    Rescanned cells get their new entry as a whole. Other cells listed in ``entries`` keep their
+    curated entry, only gaining detected symmetries.
+    """
+    lines = []
+    for comp_name, cell in cells.items():
+        if cell.pop("rescanned", False):
+            for warning in cell["warnings"]:
+                print(warning)
+            lines.append(cell["line"])
+        elif comp_name in entries:
+            lines.append(with_model(entries[comp_name], cell.get("model", "{}")))
+        else:
+            lines.append(cell["line"])
+    return lines
+
+
+def sources_digest(family, mod_name):
+    """Hash of the converter and technology sources, which invalidate the whole manifest."""
+    digest = hashlib.sha256()
+    digest.update(pathlib.Path(__file__).read_bytes())
+    digest.update((pathlib.Path(family) / mod_name / "technology.py").read_bytes())
+    return digest.hexdigest()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate _component_data.py for both PDKs"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="Ignore the manifest and rescan all"
+    )
+    args = parser.parse_args()
+
+    manifest_path = pathlib.Path(__file__).parent / "component_manifest.json"
+    manifest = {}
+    if manifest_path.is_file() and not args.full:
+        manifest = json.loads(manifest_path.read_text())
+
+    with ProcessPoolExecutor(args.jobs) as executor:
+        for family, preamble in preambles.items():
+            mod_name = "siepic_forge" if family == "si" else f"siepic_{family}_forge"
+            path = pathlib.Path(f"{family}/{mod_name}/library")
+            output = (
+                pathlib.Path(__file__).parent / family / mod_name / "_component_data.py"
+            )
+
+            previous = manifest.get(family, {})
+            digest = sources_digest(family, mod_name)
+            if previous.get("sources") != digest:
+                previous = {}
+            previous_files = previous.get("files", {})
+
+            component_data = importlib.import_module(
+                f"{mod_name}._component_data"
+            )._component_data
+            curated = {name: data[1] for name, data in component_data.items()}
+            thumbnails = {name: data[3] for name, data in component_data.items()}
+
+            files = {}
+            futures = {}
+            for gds_name in sorted(path.glob("*.gds")):
+                file_digest = hashlib.sha256(gds_name.read_bytes()).hexdigest()
+                known = previous_files.get(gds_name.name, {})
+                if known.get("hash") == file_digest:
+                    files[gds_name.name] = known
+                else:
+                    files[gds_name.name] = {"hash": file_digest}
+                    futures[gds_name.name] = executor.submit(
+                        scan_library,
+                        family,
+                        str(gds_name),
+                        known.get("cells", {}),
+                        curated,
+                        thumbnails,
+                    )
+
+            entries = existing_entries(output)
+            lines = []
+            for gds_name, data in files.items():
+                if gds_name in futures:
+                    print(f"Scanning {family}/{gds_name}", flush=True)
+                    data["cells"] = futures[gds_name].result()
+                lines.extend(merge_entries(data["cells"], entries))
+
+            manifest[family] = {"sources": digest, "files": files}
+
+            output.write_text(preamble + "\n".join(lines) + "\n}")
+            subprocess.run(["ruff", "format", output], check=True)
+
+    manifest_path.write_text(json.dumps(manifest, indent=2))
@@ -0,0 +1,228 @@
+import argparse
+import importlib
+import json
+import pathlib
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+import photonforge as pf
+
+sys.path.append("./si")
+sys.path.append("./sin")
+
+import siepic_forge as siepic_si
+import siepic_sin_forge as siepic_sin
+
+layer_remaps = {(1, 99): (1, 0)}
+
+
+def _segment_distances(points, start, end):
+    """Distance from each point to the segment between start and end."""
+    direction = end - start
+    length2 = direction @ direction
+    if length2 == 0:
+        return numpy.linalg.norm(points - start, axis=1)
+    t = numpy.clip((points - start) @ direction / length2, 0, 1)
+    return numpy.linalg.norm(points - (start + t[:, None] * direction), axis=1)
+
+
+def _simplify_chain(points, tolerance):
+    """Douglas-Peucker simplification of an open chain.
+
+    Returns:
+        Indices of the kept points and the maximal distance from any removed point to the
+        simplified chain.
+    """
+    keep = numpy.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    deviation = 0.0
+    stack = [(0, len(points) - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        distances = _segment_distances(points[i + 1 : j], points[i], points[j])
+        k = int(numpy.argmax(distances))
+        if distances[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+        else:
+            deviation = max(deviation, float(distances[k]))
+    return numpy.flatnonzero(keep), deviation
+
+
+def simplify_vertices(vertices, tolerance):
+    """Remove polygon vertices that deviate less than a tolerance from the outline.
+
+    Returns:
+        Simplified vertices and the maximal deviation of the removed vertices.
+    """
+    vertices = numpy.asarray(vertices, dtype=float)
+    if len(vertices) <= 4:
+        return vertices, 0.0
+
+    # Start at a convex hull vertex, which is never removed, and split the closed outline at the
+    # vertex farthest from it
+    vertices = numpy.roll(vertices, -int(numpy.lexsort(vertices.T[::-1])[0]), axis=0)
+    far = int(numpy.argmax(numpy.linalg.norm(vertices - vertices[0], axis=1)))
+    first, deviation0 = _simplify_chain(vertices[: far + 1], tolerance)
+    second, deviation1 = _simplify_chain(
+        numpy.vstack((vertices[far:], vertices[:1])), tolerance
+    )
+    indices = numpy.concatenate((first, second[1:-1] + far))
+    if len(indices) < 3:
+        return vertices, 0.0
+    return vertices[indices], max(deviation0, deviation1)
+
+
+def _vertex_count(structure):
+    if not isinstance(structure, pf.Polygon):
+        return sum(_vertex_count(p) for p in pf.boolean([structure], [], "+"))
+    return len(structure.vertices) + sum(
+        len(h) for h in getattr(structure, "holes", [])
+    )
+
+
+def optimize_cell(comp, layers, tolerance):
+    """Sanitize and simplify a cell in place.
+
+    Labels containing "lumerical" are removed and layers are remapped for all structures. In the
+    given layers, touching polygons are merged and the vertices simplified within the tolerance.
+    The geometry is left unchanged if that does not reduce the number of vertices.
+
+    Returns:
+        Dictionary with the vertex counts before and after the optimization and the maximal
+        geometric deviation.
+    """
+    for layer, labels in comp.labels.items():
+        for label in labels:
+            if "lumerical" in label.text.lower():
+                comp.remove(label, layer=layer)
+    comp.remap_layers(layer_remaps)
+
+    before = 0
+    after = 0
+    deviation = 0.0
+    replacements = []
+    for layer, structures in comp.structures.items():
+        if layer not in layers or len(structures) == 0:
+            continue
+        merged = []
+        for polygon in pf.boolean(structures, [], "+"):
+            vertices, d = simplify_vertices(polygon.vertices, tolerance)
+            holes = []
+            for hole in getattr(polygon, "holes", []):
+                hole_vertices, hole_d = simplify_vertices(hole, tolerance)
+                holes.append(hole_vertices)
+                d = max(d, hole_d)
+            merged.append(
+                pf.Polygon(vertices, holes) if len(holes) > 0 else pf.Polygon(vertices)
+            )
+            deviation = max(deviation, d)
+            after += len(vertices) + sum(len(h) for h in holes)
+        before += sum(_vertex_count(s) for s in structures)
+        replacements.append((layer, structures, merged))
+
+    if after >= before:
+        return {
+            "vertices_before": before,
+            "vertices_after": before,
+            "max_deviation": 0.0,
+        }
+
+    for layer, structures, merged in replacements:
+        comp.remove(*structures, layer=layer)
+        comp.add(layer, *merged)
+    return {
+        "vertices_before": before,
+        "vertices_after": after,
+        "max_deviation": deviation,
+    }
+
+
+def optimize_library(family, gds_name, output, tolerance):
+    """Write an optimized copy of a library file.
+
+    Returns:
+        Report with the optimization results for each cell, sorted by name.
+    """
+    technology = siepic_sin.ebeam() if family == "sin" else siepic_si.ebeam()
+    layers = set().union(
+        *(e.mask_spec.get_layers() for e in technology.extrusion_specs)
+    )
+    components = pf.load_layout(gds_name, technology=technology)
+    report = {
+        name: optimize_cell(components[name], layers, tolerance)
+        for name in sorted(components)
+    }
+    top_level = pf.find_top_level(*components.values())
+    pf.write_layout(str(output / pathlib.Path(gds_name).name), *top_level)
+    return report
+
+
+def invalidate_derived(family, mod_name):
+    """Regenerate the GDS index and remove the outputs built from the old library files."""
+    library = pathlib.Path(family) / mod_name / "library"
+    gds_index = importlib.import_module(f"{mod_name}.gds_index")
+    gds_index.write_index(library / "gds_index.json", library)
+    (library / "components.phf").unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write sanitized and simplified library GDSII files for both PDKs"
+    )
+    parser.add_argument(
+        "-t", "--tolerance", type=float, default=0.001, help="Tolerance (μm)"
+    )
+    parser.add_argument(
+        "-o", "--output", default="build/library", help="Output directory"
+    )
+    parser.add_argument(
+        "--in-place", action="store_true", help="Overwrite the library files"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="Number of worker processes"
+    )
+    args = parser.parse_args()
+
+    reports = {}
+    with ProcessPoolExecutor(args.jobs) as executor:
+        futures = {}
+        for family in ("si", "sin"):
+            mod_name = "siepic_forge" if family == "si" else f"siepic_{family}_forge"
+            path = pathlib.Path(f"{family}/{mod_name}/library")
+            output = path if args.in_place else pathlib.Path(args.output) / family
+            output.mkdir(parents=True, exist_ok=True)
+            for gds_name in sorted(path.glob("*.gds")):
+                key = f"{family}/{gds_name.name}"
+                futures[key] = executor.submit(
+                    optimize_library, family, str(gds_name), output, args.tolerance
+                )
+
+        for key, future in futures.items():
+            reports[key] = future.result()
+            before = sum(c["vertices_before"] for c in reports[key].values())
+            after = sum(c["vertices_after"] for c in reports[key].values())
+            deviation = max(
+                (c["max_deviation"] for c in reports[key].values()), default=0.0
+            )
+            print(
+                f"{key}: {before} → {after} vertices, max. deviation {deviation:g} μm"
+            )
+
+    if args.in_place:
+        for family in ("si", "sin"):
+            mod_name = "siepic_forge" if family == "si" else f"siepic_{family}_forge"
+            invalidate_derived(family, mod_name)
+        # Cells are rescanned on the next component_converter.py run
+        (pathlib.Path(__file__).parent / "component_manifest.json").unlink(
+            missing_ok=True
+        )
+
+    report_path = pathlib.Path(args.output) / "library_report.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(reports, indent=2))
@@ -0,0 +1,9 @@
+import pathlib
+
+from siepic_forge.gds_index import write_index
+
+if __name__ == "__main__":
+    library = pathlib.Path(__file__).parent / "siepic_forge" / "library"
+    output = library / "gds_index.json"
+    print(f"Writing library index to {output}", flush=True)
+    write_index(output, library)
@@ -1,48 +1,202 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+import re
 import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import photonforge as pf
 from photonforge import pda
 
 import siepic_forge as siepic
-
-
-def ignore_components(path, names):
-    return [n for n in names if n == "library" or "component" in n]
-
-
-def create_library():
+from siepic_forge.s_matrix_cache import (
+    SiEPICTidy3DModel,
+    _hash_component,
+    _hash_model,
+    _hash_technology,
+)
+
+# Modules published in the platform: the technology and its dependencies. Components are added
+# directly, so the library files and the modules that depend on them are left out.
+published_modules = ("__init__", "_layers", "_media_cache", "instrumentation", "technology")
+
+
+def publish_module(source, destination):
+    """Copy the published modules and patch ``__init__`` to remove the unpublished attributes."""
+    destination = pathlib.Path(destination)
+    destination.mkdir(parents=True, exist_ok=True)
+    for name in published_modules:
+        shutil.copy2(pathlib.Path(source) / f"{name}.py", destination / f"{name}.py")
+
+    init = destination / "__init__.py"
+    lines = []
+    for line in init.read_text().splitlines():
+        if line.startswith(("from ._component_data", "component_names =")):
+            continue
+        # Entries of _lazy_attributes ("name": ".module",) and of the lazy submodule names
+        match = re.fullmatch(r'\s*"\w+": "\.(\w+)",|\s*"(\w+)",', line)
+        if match is not None and (match[1] or match[2]) not in published_modules:
+            continue
+        lines.append(line)
+    init.write_text("\n".join(lines) + "\n")
+
+
+def component_digest(component):
+    """Content hash of the component geometry, ports, technology and model arguments."""
+    digest = hashlib.sha256()
+    _hash_component(digest, component)
+    _hash_technology(digest, component.technology)
+    for name, model in sorted(component.models.items()):
+        digest.update(name.encode())
+        _hash_model(digest, model)
+    return digest.hexdigest()
+
+
+def library_components(technology, digests, skip={}):
+    """Build the library components lazily, yielding each with its build time.
+
+    Library Tidy3D models are replaced by plain :class:`photonforge.Tidy3DModel`
+    instances. The content hash of each component is stored in ``digests``.
+    Components whose hash matches the one in ``skip`` are not yielded.
+    """
+    for name in sorted(siepic.component_names):
+        start = time.perf_counter()
+        component = siepic.component(name, technology)
+        # The platform does not have the local cache model class
+        for model_name, model in component.models.items():
+            if isinstance(model, SiEPICTidy3DModel):
+                component.add_model(
+                    pf.Tidy3DModel(**model.parametric_kwargs),
+                    model_name,
+                    set_active=component.active_model is model,
+                )
+        digests[name] = component_digest(component)
+        if skip.get(name) != digests[name]:
+            yield component, time.perf_counter() - start
+
+
+def upload_components(project, components, batch_size=8, max_workers=4, added=None):
+    """Add components to the project in batches through a worker pool.
+
+    The project config is not updated, so the technology must be added
+    before the components (see :func:`create_library`). At most
+    ``max_workers`` batches are in flight, so only a bounded number of
+    components is built ahead of the uploads.
+    If set, ``added`` is called with each component after it is uploaded.
+
+    Returns:
+        dict[str, tuple[float, float]]: Build and upload times per component.
+    """
+    timings = {}
+
+    def add_batch(batch):
+        for component, build_time in batch:
+            start = time.perf_counter()
+            project.add(component, update_existing_dependencies=False, update_config=False)
+            upload_time = time.perf_counter() - start
+            timings[component.name] = (build_time, upload_time)
+            if added is not None:
+                added(component)
+            print(
+                f"Added {component.name!r} "
+                f"(build: {build_time:.3f} s, upload: {upload_time:.3f} s)",
+                flush=True,
+            )
+
+    components = iter(components)
+    with ThreadPoolExecutor(max_workers) as executor:
+        pending = set()
+        while batch := list(itertools.islice(components, batch_size)):
+            if len(pending) >= max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(executor.submit(add_batch, batch))
+        for future in pending:
+            future.result()
+
+    return timings
+
+
+class PublishState:
+    """Publishing state stored between runs.
+
+    The state file records the project, the content hash of each component
+    in the last published version and, while a version is being published,
+    the components already uploaded for it (the resume checkpoint).
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.lock = threading.Lock()
+        self.data = {"project": None, "published": {}, "pending": {}}
+        if self.path.is_file():
+            self.data.update(json.loads(self.path.read_text()))
+
+    def save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
+
+    def uploaded(self, version):
+        """Components already present in the project for this version."""
+        components = dict(self.data["published"].get("components", {}))
+        pending = self.data["pending"]
+        if pending.get("version") == version:
+            components.update(pending["components"])
+        return components
+
+    def checkpoint(self, version, name, digest):
+        with self.lock:
+            pending = self.data["pending"]
+            if pending.get("version") != version:
+                pending = self.data["pending"] = {"version": version, "components": {}}
+            pending["components"][name] = digest
+            self.save()
+
+    def publish(self, version, digests):
+        with self.lock:
+            self.data["published"] = {"version": version, "components": dict(digests)}
+            self.data["pending"] = {}
+            self.save()
+
+
+def create_library(
+    api=pda, batch_size=8, max_workers=4, state_file="pda_library_state.json", version=None
+):
     name = "SiEPIC EBeam"
     description = "SiEPIC EBeam Si PDK"
-    version = siepic.ebeam().version
+    if version is None:
+        version = siepic.ebeam().version
 
-    for lib in pda.list_libraries(name):
+    for lib in api.list_libraries(name):
         if lib["version"] == version:
             print(f"Library already exists: {lib!r}")
             return
 
-    print(f"Creating library {name!r} - version {version!r}", flush=True)
-    project = pda.create_project(
-        name=name,
-        description=description,
-        visibility="public",
-        role="viewer",
-        create_template=False,
-    )
-
-    # Add sources: static components will be added directly, so we don't need the reference GDS
-    shutil.copytree(
-        "./siepic_forge",
-        project.module_path / project.module_name,
-        dirs_exist_ok=True,
-        ignore=ignore_components,
-    )
-
-    # Patch __init__ to remove components
-    init = project.module_path / project.module_name / "__init__.py"
-    init.write_text(
-        "\n".join(x for x in init.read_text().splitlines() if not x.startswith("from .component"))
-        + "\n"
-    )
+    state = PublishState(state_file)
+    if state.data["project"] is None:
+        print(f"Creating library {name!r} - version {version!r}", flush=True)
+        project = api.create_project(
+            name=name,
+            description=description,
+            visibility="public",
+            role="viewer",
+            create_template=False,
+        )
+        state.data["project"] = project.id
+        state.save()
+    else:
+        print(f"Updating library {name!r} - version {version!r}", flush=True)
+        project = api.load_project(project_id=state.data["project"])
+
+    # Add sources: static components will be added directly, so we don't need the library
+    publish_module("./siepic_forge", project.module_path / project.module_name)
 
     project.save_module()
     module = project.import_module(None)[project.module_name]
@@ -50,24 +204,41 @@ def create_library():
     tech = module.ebeam()
     pf.config.default_technology = tech
 
-    components = [siepic.component(n, tech) for n in siepic.component_names]
-
-    # Add components
-    update_config = True
-    for component in components:
-        print("Adding", repr(component.name), flush=True)
-        project.add(component, update_existing_dependencies=False, update_config=update_config)
-        update_config = False
+    # The technology is added alone, before any concurrent uploads, so that the project config is
+    # written in every run, even when no component changed
+    project.add(tech, update_existing_dependencies=False, update_config=True)
+
+    # Only components changed since the last published version (or the last checkpoint) are added
+    digests = {}
+    components = library_components(tech, digests, state.uploaded(version))
+    start = time.perf_counter()
+    timings = upload_components(
+        project,
+        components,
+        batch_size,
+        max_workers,
+        lambda c: state.checkpoint(version, c.name, digests[c.name]),
+    )
+    print(f"Added {len(timings)} components in {time.perf_counter() - start:.3f} s", flush=True)
 
     project.add_version(version)
+    state.publish(version, digests)
 
     print(f"Done: {project!r}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish the PDK library")
+    parser.add_argument("-b", "--batch-size", type=int, default=8, help="Components per batch")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="Concurrent upload workers")
+    parser.add_argument(
+        "-s", "--state", default="pda_library_state.json", help="Publishing state file"
+    )
+    args = parser.parse_args()
+
     pda.init()
 
     try:
-        create_library()
+        create_library(batch_size=args.batch_size, max_workers=args.jobs, state_file=args.state)
     finally:
         pda.stop()
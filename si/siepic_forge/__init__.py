@@ -1,36 +1,96 @@
-from .component import component, component_names  # noqa: F401
-from .technology import ebeam
+import importlib
+import importlib.util
+import sys
+import types
+
+from ._component_data import _component_data
 
 __version__ = "1.2.2"
 
+component_names = set(_component_data.keys())
+
+# Attributes resolved on first use, so that importing the package (for example, to list the
+# component names) does not import photonforge and tidy3d.
+_lazy_attributes = {
+    "cache_capacity": ".component",
+    "cache_info": ".component",
+    "clear_cache": ".component",
+    "component": ".component",
+    "components": ".component",
+    "write_bundle": ".component",
+    "plot_cross_section": ".cross_section",
+    "ebeam": ".technology",
+    "precompute_port_modes": ".technology",
+    "add_routes": ".routing",
+    "route_polygons": ".routing",
+    "ProcessGridModel": ".grid_model",
+    "build_grid_model": ".grid_model",
+    "simulate_library": ".library_simulation",
+}
+
+
+def __getattr__(name):
+    module_name = _lazy_attributes.get(name)
+    if module_name is None:
+        if name in (
+            "cross_section",
+            "grid_model",
+            "instrumentation",
+            "library_simulation",
+            "monte_carlo",
+            "routing",
+            "s_matrix_cache",
+            "technology",
+        ):
+            return importlib.import_module("." + name, __name__)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
+
+
+def _register_models():
+    # Library components use a model class that must be registered before loading phf files. The
+    # cache module with that class is not part of the technology package published to the platform.
+    if importlib.util.find_spec(".s_matrix_cache", __name__) is not None:
+        importlib.import_module(".s_matrix_cache", __name__)
+
+
+class _ModelRegistration:
+    # Import hook that registers the model class right after photonforge is imported
+    def find_spec(self, fullname, path, target=None):
+        if fullname != "photonforge":
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        if spec is None or spec.loader is None:
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def exec_and_register(module):
+            exec_module(module)
+            _register_models()
+
+        spec.loader.exec_module = exec_and_register
+        return spec
+
+
+if "photonforge" in sys.modules:
+    _register_models()
+else:
+    sys.meta_path.insert(0, _ModelRegistration())
+
+
+class _Module(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Importing the 'component' submodule must not shadow the function with the same name
+        if name in _lazy_attributes and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
 
-def plot_cross_section(technology=None):
-    import photonforge as pf  # noqa: PLC0415
-
-    if technology is None:
-        technology = ebeam()
-
-    c = pf.Component("Extrusion test", technology)
-    c.add(
-        "Si",
-        pf.Rectangle((0, -1), (0.5, 1)),
-        "Si Slab",
-        pf.Rectangle((-1, -1), (1.5, 1)),
-        "Oxide open to BOX",
-        pf.Rectangle((-2, -1), (2.5, 1)),
-        "Si",
-        pf.Rectangle((4.5, -1), (5.5, 1)),
-        "M1_heater",
-        pf.Rectangle((6, -1), (12, 1)),
-        "M2_router",
-        pf.Rectangle((8, -1), (12, 1)),
-        "M_Open",
-        pf.Rectangle((9, -1), (11, 1)),
-        "Deep Trench",
-        pf.Rectangle((15, -1), (20, 1)),
-    )
-
-    ax = pf.tidy3d_plot(c, y=0)
-    ax.set(title=technology.name)
-
-    return ax
+sys.modules[__name__].__class__ = _Module
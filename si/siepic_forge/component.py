@@ -1,4 +1,12 @@
+import collections
+import hashlib
+import os
+import pathlib
+import tempfile
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal
 
 try:
     from importlib.resources import as_file, files
@@ -8,15 +16,470 @@ except ImportError:
 import photonforge as pf
 import photonforge.typing as pft
 
+from . import component_names, gds_index
 from ._component_data import _component_data
+from .instrumentation import stage
+from .s_matrix_cache import SiEPICTidy3DModel, _read_s_matrix
 
-component_names = set(_component_data.keys())
+CacheInfo = collections.namedtuple("CacheInfo", ("hits", "misses", "maxsize", "currsize"))
+
+
+class _LRUCache:
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: object, count: bool = True) -> object | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.hits += count
+                return value
+            self.misses += count
+            return None
+
+    def set(self, key: object, value: object) -> None:
+        with self._lock:
+            if self.maxsize != 0:
+                self._data[key] = value
+                self._data.move_to_end(key)
+                self._trim()
+
+    def _trim(self) -> None:
+        while self.maxsize > 0 and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def set_capacity(self, capacity: int) -> None:
+        with self._lock:
+            self.maxsize = capacity
+            if capacity == 0:
+                self._data.clear()
+            self._trim()
+
+
+_caches = {"layout": _LRUCache(16), "component": _LRUCache(256)}
+
+
+def _technology_digest(technology: pf.Technology) -> str:
+    """Content fingerprint of a technology, so that changes made in place invalidate the caches."""
+    return hashlib.sha256(
+        repr(
+            (
+                technology.name,
+                technology.version,
+                sorted(technology.parametric_kwargs.items()),
+                technology.layers,
+                technology.extrusion_specs,
+                technology.ports,
+            )
+        ).encode()
+    ).hexdigest()
+
+
+def _load_partial(
+    libname: str, cell_name: str, technology: pf.Technology
+) -> dict[str, pf.Component] | None:
+    # Load only the records of a cell and its dependencies from a multi-cell library file
+    closure = gds_index.cell_closure(libname, cell_name)
+    if closure is None or len(closure) == len(gds_index.library_cells(libname)):
+        return None
+
+    key = (libname, tuple(closure), _technology_digest(technology))
+    layout = _caches["layout"].get(key)
+    if layout is None:
+        with stage("component.gds_load"):
+            stream = gds_index.read_cell(libname, cell_name)
+            if stream is None:
+                return None
+            fd, fname = tempfile.mkstemp(suffix=".gds")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    file.write(stream)
+                layout = pf.load_layout(fname, technology=technology)
+            finally:
+                pathlib.Path(fname).unlink(missing_ok=True)
+        _caches["layout"].set(key, layout)
+    return layout
+
+
+def _load_library(
+    libname: str, technology: pf.Technology, cell_name: str | None = None
+) -> dict[str, pf.Component]:
+    key = (libname, _technology_digest(technology))
+
+    # A single cell is read partially, unless the whole library file is already cached
+    if cell_name is not None and _caches["layout"].get(key, False) is None:
+        layout = _load_partial(libname, cell_name, technology)
+        if layout is not None:
+            return layout
+
+    layout = _caches["layout"].get(key)
+    if layout is None:
+        with stage("component.gds_load"):
+            gdsii = files("siepic_forge") / "library" / (libname + ".gds")
+            with as_file(gdsii) as fname:
+                layout = pf.load_layout(fname, technology=technology)
+            _caches["layout"].set(key, layout)
+    return layout
+
+
+_bundle_path = files("siepic_forge") / "library" / "components.phf"
+_bundle_lock = threading.Lock()
+_bundle = None
+
+# Increment when the contents of the bundled components change for the same library sources
+_bundle_format = 2
+
+
+def _library_digest() -> str:
+    """Digest of the bundle format and all library sources used to create the bundle."""
+    digest = hashlib.sha256()
+    digest.update(str(_bundle_format).encode())
+    digest.update(repr(_component_data).encode())
+    library = files("siepic_forge") / "library"
+    for libname in sorted({data[0] for data in _component_data.values()}):
+        digest.update(libname.encode())
+        digest.update((library / (libname + ".gds")).read_bytes())
+    return digest.hexdigest()
+
+
+# Errors from unreadable bundles (corrupt, truncated or written by another photonforge version)
+_bundle_errors = (RuntimeError, OSError, ValueError, TypeError, KeyError)
+
+
+def _disable_bundle(error: Exception, stacklevel: int) -> None:
+    global _bundle
+
+    # Must be called with the bundle lock acquired
+    if _bundle:
+        _bundle[0].close()
+    _bundle = False
+    warnings.warn(
+        f"Library bundle {str(_bundle_path)!r} could not be read ({error}). Components are "
+        "loaded from the library GDSII files instead.",
+        RuntimeWarning,
+        stacklevel,
+    )
+
+
+def _open_bundle() -> tuple[pf.PhfStream, pf.Technology] | None:
+    global _bundle
+
+    # Must be called with the bundle lock acquired
+    if _bundle is None:
+        _bundle = False
+        if _bundle_path.is_file():
+            stream = None
+            try:
+                with as_file(_bundle_path) as fname:
+                    stream = pf.PhfStream(str(fname), "r", False)
+                digest = getattr(stream.properties, "source_digest", b"")
+                if isinstance(digest, bytes):
+                    digest = digest.decode()
+                technologies = stream.load_technology()
+            except _bundle_errors as error:
+                if stream is not None:
+                    stream.close()
+                _disable_bundle(error, 5)
+                return None
+            if digest == _library_digest() and len(technologies) == 1:
+                _bundle = (stream, technologies[0])
+            else:
+                stream.close()
+    return _bundle or None
+
+
+def _load_bundled(
+    cell_name: str, technology: pf.Technology, tidy3d_model_kwargs: dict
+) -> pf.Component | None:
+    with _bundle_lock:
+        bundle = _open_bundle()
+        if bundle is None or bundle[1] != technology:
+            return None
+        with stage("component.gds_load"):
+            try:
+                loaded = bundle[0].load_component(cell_name)
+            except _bundle_errors as error:
+                _disable_bundle(error, 4)
+                return None
+
+    if len(loaded) != 1:
+        return None
+    c = loaded[0]
+    c.replace_technology(technology)
+
+    thumbnail = _component_data[cell_name][3]
+    if thumbnail:
+        c.properties.__thumbnail__ = thumbnail
+
+    # The bundled model is only replaced when model arguments are set
+    if len(tidy3d_model_kwargs) > 0:
+        _add_model(c, cell_name, technology, tidy3d_model_kwargs)
+
+    return c
+
+
+def write_bundle(filename: str, technology: pf.Technology | None = None) -> None:
+    """Write all library components to a prebuilt bundle file.
+
+    The bundle is used by :func:`component` to avoid parsing and processing
+    the library GDSII files when the requested technology matches the one
+    used to create the bundle. It is automatically ignored if the library
+    files change after it has been written.
+
+    Args:
+        filename (str): Output phf file.
+        technology (Technology): Technology used for the bundled components.
+          If ``None``, the default :func:`ebeam` technology is used.
+    """
+    if technology is None:
+        from .technology import ebeam  # noqa: PLC0415
+
+        technology = ebeam()
+
+    bundled = components(technology=technology, use_bundle=False)
+    stream = pf.PhfStream(str(filename), "w")
+    stream.properties.source_digest = _library_digest()
+    stream.write(technology, *(bundled[name] for name in sorted(bundled)))
+    stream.close()
+
+
+def clear_cache() -> None:
+    """Clear the caches used by :func:`component`.
+
+    Both the parsed library files and the finished components are removed
+    from cache. The prebuilt component bundle is also closed and verified
+    again on the next load.
+    """
+    global _bundle
+    for cache in _caches.values():
+        cache.clear()
+    with _bundle_lock:
+        if _bundle:
+            _bundle[0].close()
+        _bundle = None
+
+
+def cache_info(cache: Literal["layout", "component"] = "layout") -> CacheInfo:
+    """Report statistics for the caches used by :func:`component`.
+
+    Args:
+        cache: Either ``"layout"``, for the cache of parsed library files,
+          or ``"component"``, for the cache of finished components.
+
+    Returns:
+        CacheInfo: Named tuple with the number of cache ``hits`` and
+        ``misses``, the maximal cache size ``maxsize`` and the current
+        number of cached entries ``currsize``.
+    """
+    return _caches[cache].info()
+
+
+def cache_capacity(capacity: int, cache: Literal["layout", "component"] | None = None) -> None:
+    """Set the maximal number of entries kept in the caches.
+
+    Args:
+        capacity: New cache capacity. Zero disables the cache and a negative
+          value removes the capacity limit.
+        cache: Cache to be modified (see :func:`cache_info`). If ``None``,
+          all caches are modified.
+    """
+    for name, c in _caches.items():
+        if cache is None or cache == name:
+            c.set_capacity(capacity)
+
+
+_data_path = files("siepic_forge") / "library" / "s_matrix"
+
+
+def _add_data_model(c: pf.Component, cell_name: str, stacklevel: int) -> None:
+    resource = _data_path / (cell_name + ".npz")
+    if not resource.is_file():
+        warnings.warn(
+            f"Tabulated data not available for component {cell_name!r}. Using the Tidy3D model.",
+            RuntimeWarning,
+            stacklevel,
+        )
+        return
+    with as_file(resource) as filename:
+        s_matrix = _read_s_matrix(filename, c.ports)
+    c.add_model(pf.DataModel(s_matrix), "Data")
+
+
+def _check_model(model: str) -> None:
+    if model not in ("tidy3d", "data"):
+        raise ValueError("Argument 'model' must be one of 'tidy3d' or 'data'.")
+
+
+def _model_kwargs_key(tidy3d_model_kwargs: dict) -> str:
+    if len(tidy3d_model_kwargs) == 0:
+        return ""
+    return hashlib.sha256(repr(sorted(tidy3d_model_kwargs.items())).encode()).hexdigest()
+
+
+def _with_technology(c: pf.Component, technology: pf.Technology, shared: bool) -> pf.Component:
+    # Copies include the dependencies, which are shared with the cached component otherwise. Cached
+    # components may have been created with a different, but equal, technology instance.
+    if c.technology is technology and shared:
+        return c
+    c = c.copy(deep=True)
+    if c.technology is not technology:
+        c.replace_technology(technology)
+    return c
+
+
+def _simulation_bounds(c: pf.Component, margin: float = 1.0) -> tuple | None:
+    """Tight simulation bounds from the DevRec outline and the component ports.
+
+    Sides where ports are located are left unset, so that the model can pad the port planes as
+    usual. The vertical extent is taken from the port spec limits when all ports are planar.
+    """
+    devrec = c.structures.get((68, 0), [])
+    if len(devrec) == 0:
+        return None
+
+    (x_min, y_min), (x_max, y_max) = devrec[0].bounds()
+    for structure in devrec[1:]:
+        (x0, y0), (x1, y1) = structure.bounds()
+        x_min, y_min, x_max, y_max = min(x_min, x0), min(y_min, y0), max(x_max, x1), max(y_max, y1)
+    lower = [x_min - margin, y_min - margin, None]
+    upper = [x_max + margin, y_max + margin, None]
+
+    z_limits = []
+    for port in c.ports.values():
+        if not isinstance(port, pf.Port):
+            z_limits = None
+            continue
+        direction = port.input_direction % 360
+        if direction not in (0, 90, 180, 270):
+            return None
+        axis = 0 if direction in (0, 180) else 1
+        side = lower if direction in (0, 90) else upper
+        side[axis] = None
+
+        # Make sure the whole port cross-section is inside the simulation domain
+        other = 1 - axis
+        half_width = 0.5 * port.spec.width + margin
+        if lower[other] is not None:
+            lower[other] = min(lower[other], port.center[other] - half_width)
+        if upper[other] is not None:
+            upper[other] = max(upper[other], port.center[other] + half_width)
+        if z_limits is not None:
+            z_limits.append(port.spec.limits)
+
+    if z_limits:
+        lower[2] = min(z[0] for z in z_limits)
+        upper[2] = max(z[1] for z in z_limits)
+
+    return (tuple(lower), tuple(upper))
+
+
+def _add_model(
+    c: pf.Component, cell_name: str, technology: pf.Technology, tidy3d_model_kwargs: dict
+) -> None:
+    _, port_data, kwargs, _ = _component_data[cell_name]
+    if kwargs is None:
+        return
+
+    kwargs = dict(kwargs)
+    port_error = any(
+        len(data) == 3 and not isinstance(data[1], tuple) and data[2] not in technology.ports
+        for data in port_data
+    )
+    if port_error and "port_symmetries" in kwargs:
+        del kwargs["port_symmetries"]
+    if "bounds" not in kwargs:
+        bounds = _simulation_bounds(c)
+        if bounds is not None:
+            kwargs["bounds"] = bounds
+    kwargs.update(tidy3d_model_kwargs)
+    c.add_model(SiEPICTidy3DModel(**kwargs), "Tidy3D")
+
+
+def _build_component(
+    cell_name: str,
+    layout: dict[str, pf.Component],
+    technology: pf.Technology,
+    tidy3d_model_kwargs: dict,
+    stacklevel: int,
+) -> pf.Component:
+    _, port_data, _, thumbnail = _component_data[cell_name]
+
+    # Copy the library cell, so that the cached layout is never modified
+    c = layout[cell_name].copy(deep=True)
+
+    if thumbnail:
+        c.properties.__thumbnail__ = thumbnail
+
+    with stage("component.label_strip"):
+        for layer, labels in c.labels.items():
+            for label in labels:
+                if "lumerical" in label.text.lower():
+                    c.remove(label, layer=layer)
+
+    # Add ports
+    with stage("component.ports"):
+        z = (
+            0.1
+            + technology.parametric_kwargs.get("top_oxide_thickness", 3.0)
+            + technology.parametric_kwargs.get("passivation_oxide_thickness", 0.3)
+        )
+        for data in port_data:
+            if len(data) == 3:
+                if isinstance(data[1], tuple):
+                    terminal = pf.Terminal(
+                        technology.layers[data[2]].layer, pf.Rectangle(center=data[0], size=data[1])
+                    )
+                    c.add_terminal(terminal)
+                else:
+                    port_spec = technology.ports.get(data[2])
+                    if port_spec is None:
+                        warnings.warn(
+                            f"Required port spec {data[2]} not available in technology "
+                            f"{technology.name!r}. Port skipped.",
+                            RuntimeWarning,
+                            stacklevel,
+                        )
+                    else:
+                        port = pf.Port(data[0], data[1], port_spec)
+                        c.add_port(port)
+            else:
+                port = pf.GaussianPort(
+                    data[0] + (z,),
+                    data[1],
+                    waist_radius=data[2],
+                    polarization_angle=data[3],
+                )
+                c.add_port(port)
+
+    # Add model
+    with stage("component.model"):
+        _add_model(c, cell_name, technology, tidy3d_model_kwargs)
+
+    return c
 
 
 def component(
     cell_name: str,
     technology: pf.Technology | None = None,
     tidy3d_model_kwargs: pft.kwargs_for(pf.Tidy3DModel) = {},
+    use_bundle: bool = True,
+    shared: bool = False,
+    model: Literal["tidy3d", "data"] = "tidy3d",
 ) -> pf.Component:
     """Load a component from the default PDK library.
 
@@ -24,7 +487,19 @@ def component(
         cell_name (str): Name of the component to load.
         technology (Technology): Technology for the created component.
         tidy3d_model_kwargs (dict): Keyword arguments passed to the Tidy3D
-          model of the created component.
+          model of the created component. Simulation ``bounds`` derived
+          from the DevRec outline and ports of the cell are used by default
+          and can be overridden here.
+        use_bundle (bool): If set, the component is loaded from the
+          prebuilt library bundle, when available.
+        shared (bool): If set, the cached component instance is returned
+          directly. It must be treated as read-only, but it is the fastest
+          option for circuits that reference the same cell many times.
+          Otherwise, a copy of the cached instance is returned.
+        model (str): Active model for the component: ``"tidy3d"`` for a
+          Tidy3D model, or ``"data"`` for a model interpolated from
+          precomputed S matrix data shipped with the package. The Tidy3D
+          model is kept as the active one for components without data.
 
     Returns:
         Component: Component loaded from the default PDK library.
@@ -32,10 +507,21 @@ def component(
     Note:
         The available component names are listed in the module-level tuple
         ``component_names``.
+
+        Parsed library files and finished components are cached per
+        technology contents and model arguments, so that repeated calls do
+        not load or process the library files again. Changes made to a
+        technology in place invalidate its cached entries. The caches can be
+        inspected with :func:`cache_info` and emptied with
+        :func:`clear_cache`.
+
+        The prebuilt bundle is only used if it is up to date with the
+        library files and the requested technology is equal to the one used
+        to create it (see :func:`write_bundle`). Otherwise the component is
+        created directly from the library GDSII file.
     """
-    libname, port_data, kwargs, thumbnail = _component_data.get(
-        cell_name, (None, None, None, None)
-    )
+    _check_model(model)
+    libname = _component_data.get(cell_name, (None,))[0]
 
     if technology is None:
         technology = pf.config.default_technology
@@ -47,61 +533,116 @@ def component(
                 2,
             )
 
-    # Load library cell
-    gdsii = files("siepic_forge") / "library" / (libname + ".gds")
-    with as_file(gdsii) as fname:
-        c = pf.load_layout(fname, technology=technology)[cell_name]
+    with stage("component"):
+        key = (
+            cell_name,
+            _technology_digest(technology),
+            _model_kwargs_key(tidy3d_model_kwargs),
+            use_bundle,
+            model,
+        )
+        c = _caches["component"].get(key)
+        if c is None:
+            if use_bundle and libname is not None:
+                c = _load_bundled(cell_name, technology, tidy3d_model_kwargs)
+            if c is None:
+                layout = _load_library(libname, technology, cell_name)
+                c = _build_component(cell_name, layout, technology, tidy3d_model_kwargs, 3)
+            if model == "data":
+                _add_data_model(c, cell_name, 3)
+            _caches["component"].set(key, c)
 
-    if thumbnail:
-        c.properties.__thumbnail__ = thumbnail
+        return _with_technology(c, technology, shared)
 
-    for layer, labels in c.labels.items():
-        for label in labels:
-            if "lumerical" in label.text.lower():
-                c.remove(label, layer=layer)
 
-    # Add ports
-    z = (
-        0.1
-        + technology.parametric_kwargs.get("top_oxide_thickness", 3.0)
-        + technology.parametric_kwargs.get("passivation_oxide_thickness", 0.3)
-    )
-    port_error = False
-    for data in port_data:
-        if len(data) == 3:
-            if isinstance(data[1], tuple):
-                terminal = pf.Terminal(
-                    technology.layers[data[2]].layer, pf.Rectangle(center=data[0], size=data[1])
-                )
-                c.add_terminal(terminal)
-            else:
-                port_spec = technology.ports.get(data[2])
-                if port_spec is None:
-                    port_error = True
-                    warnings.warn(
-                        f"Required port spec {data[2]} not available in technology "
-                        f"{technology.name!r}. Port skipped.",
-                        RuntimeWarning,
-                        2,
-                    )
-                else:
-                    port = pf.Port(data[0], data[1], port_spec)
-                    c.add_port(port)
-        else:
-            port = pf.GaussianPort(
-                data[0] + (z,),
-                data[1],
-                waist_radius=data[2],
-                polarization_angle=data[3],
+def components(
+    names: list[str] | None = None,
+    technology: pf.Technology | None = None,
+    tidy3d_model_kwargs: pft.kwargs_for(pf.Tidy3DModel) = {},
+    max_workers: int | None = None,
+    use_bundle: bool = True,
+    shared: bool = False,
+    model: Literal["tidy3d", "data"] = "tidy3d",
+) -> dict[str, pf.Component]:
+    """Load multiple components from the default PDK library.
+
+    Each library file is parsed only once for all requested cells, and the
+    components are created concurrently in a thread pool.
+
+    Args:
+        names (list[str]): Names of the components to load. If ``None``,
+          all names in ``component_names`` are used.
+        technology (Technology): Technology for the created components.
+        tidy3d_model_kwargs (dict): Keyword arguments passed to the Tidy3D
+          models of the created components.
+        max_workers (int): Maximal number of worker threads. If ``None``,
+          the default from :class:`concurrent.futures.ThreadPoolExecutor`
+          is used.
+        use_bundle (bool): If set, components are loaded from the prebuilt
+          library bundle, when available.
+        shared (bool): If set, cached component instances are returned
+          directly and must be treated as read-only.
+        model (str): Active model for the components (see
+          :func:`component`).
+
+    Returns:
+        dict[str, Component]: Components loaded from the default PDK library,
+        indexed by name.
+
+    See also:
+        :func:`component`
+    """
+    _check_model(model)
+    names = sorted(component_names) if names is None else list(dict.fromkeys(names))
+
+    missing = [n for n in names if n not in _component_data]
+    if len(missing) > 0:
+        raise ValueError(f"Components not found in the PDK library: {', '.join(missing)}.")
+
+    if technology is None:
+        technology = pf.config.default_technology
+        if "SiEPIC" not in technology.name:
+            warnings.warn(
+                f"Current default technology {technology.name} does not seem compatible with the "
+                f"SiEPIC component library",
+                RuntimeWarning,
+                2,
             )
-            c.add_port(port)
 
-    # Add model
-    if kwargs is not None:
-        kwargs = dict(kwargs)
-        if port_error and "port_symmetries" in kwargs:
-            del kwargs["port_symmetries"]
-        kwargs.update(tidy3d_model_kwargs)
-        c.add_model(pf.Tidy3DModel(**kwargs), "Tidy3D")
+    with stage("components"):
+        technology_key = _technology_digest(technology)
+        kwargs_key = _model_kwargs_key(tidy3d_model_kwargs)
+        result = {}
+        for name in names:
+            c = _caches["component"].get((name, technology_key, kwargs_key, use_bundle, model))
+            if c is None and use_bundle:
+                c = _load_bundled(name, technology, tidy3d_model_kwargs)
+                if c is not None:
+                    if model == "data":
+                        _add_data_model(c, name, 2)
+                    _caches["component"].set((name, technology_key, kwargs_key, True, model), c)
+            if c is not None:
+                result[name] = c
 
-    return c
+        # Group the remaining cells by library file
+        remaining = [name for name in names if name not in result]
+        libraries = {}
+        for name in remaining:
+            libraries.setdefault(_component_data[name][0], []).append(name)
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            loaded = executor.map(lambda libname: _load_library(libname, technology), libraries)
+            layouts = dict(zip(libraries, loaded, strict=True))
+            built = executor.map(
+                lambda name: _build_component(
+                    name, layouts[_component_data[name][0]], technology, tidy3d_model_kwargs, 2
+                ),
+                remaining,
+            )
+            for name, c in zip(remaining, built, strict=True):
+                if model == "data":
+                    _add_data_model(c, name, 2)
+                _caches["component"].set((name, technology_key, kwargs_key, use_bundle, model), c)
+                result[name] = c
+
+        return {name: _with_technology(result[name], technology, shared) for name in names}
@@ -0,0 +1,174 @@
+"""Opt-in stage timing for component loading and technology creation.
+
+The stages of :func:`component` (``"component.gds_load"``,
+``"component.label_strip"``, ``"component.ports"`` and
+``"component.model"``) and of :func:`ebeam` (``"ebeam.layer_copy"``,
+``"ebeam.extrusion"`` and ``"ebeam.port_specs"``) report their wall time to
+all registered collectors, together with the totals ``"component"``,
+``"components"`` and ``"ebeam"`` (each technology creation, including cache
+hits). When no collector is registered, timing is skipped entirely.
+
+The metal media of the technology are created once, when the technology
+module is imported. Their creation is reported as ``"ebeam.materials"``
+only to collectors registered before that import.
+
+A collector is any object with a ``record(stage, duration)`` method.
+:class:`StageStats` aggregates call counts and times and can write them as
+JSON or CSV.
+
+Example:
+    >>> with profile() as stats:  # doctest: +SKIP
+    ...     c = component("ebeam_y_1550")
+    >>> stats.write_csv("profile.csv")  # doctest: +SKIP
+"""
+
+import contextlib
+import csv
+import json
+import pathlib
+import threading
+import time
+from collections.abc import Iterator
+from typing import Protocol
+
+_collectors = ()
+_collectors_lock = threading.Lock()
+_disabled = contextlib.nullcontext()
+
+
+class Collector(Protocol):
+    """Interface for objects that receive stage timings."""
+
+    def record(self, stage: str, duration: float) -> None: ...
+
+
+class _Stage:
+    __slots__ = ("collectors", "name", "start")
+
+    def __init__(self, name: str, collectors: tuple) -> None:
+        self.name = name
+        self.collectors = collectors
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args: object) -> None:
+        duration = time.perf_counter() - self.start
+        for collector in self.collectors:
+            collector.record(self.name, duration)
+
+
+def stage(name: str) -> contextlib.AbstractContextManager:
+    """Context manager that times a stage for the registered collectors.
+
+    Args:
+        name: Stage name.
+
+    Returns:
+        Context manager. A shared no-op context is returned when no
+        collectors are registered.
+    """
+    collectors = _collectors
+    return _Stage(name, collectors) if collectors else _disabled
+
+
+def add_collector(collector: Collector) -> None:
+    """Register a collector for stage timings.
+
+    Args:
+        collector: Object with a ``record(stage, duration)`` method.
+    """
+    global _collectors
+    with _collectors_lock:
+        _collectors = (*_collectors, collector)
+
+
+def remove_collector(collector: Collector) -> None:
+    """Unregister a collector.
+
+    Args:
+        collector: Previously registered collector.
+    """
+    global _collectors
+    with _collectors_lock:
+        _collectors = tuple(c for c in _collectors if c is not collector)
+
+
+class StageStats:
+    """Collector that aggregates call counts and wall times per stage."""
+
+    fields = ("stage", "count", "total", "min", "max", "mean")
+
+    def __init__(self) -> None:
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, duration: float) -> None:
+        with self._lock:
+            entry = self._data.get(stage)
+            if entry is None:
+                self._data[stage] = [1, duration, duration, duration]
+            else:
+                entry[0] += 1
+                entry[1] += duration
+                entry[2] = min(entry[2], duration)
+                entry[3] = max(entry[3], duration)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Aggregated statistics.
+
+        Returns:
+            dict[str, dict[str, float]]: Call ``count`` and ``total``,
+            ``min``, ``max`` and ``mean`` wall times (in seconds), indexed
+            by stage name.
+        """
+        with self._lock:
+            return {
+                name: {"count": n, "total": t, "min": lo, "max": hi, "mean": t / n}
+                for name, (n, t, lo, hi) in sorted(self._data.items())
+            }
+
+    def clear(self) -> None:
+        """Remove all recorded data."""
+        with self._lock:
+            self._data.clear()
+
+    def write_json(self, filename: str | pathlib.Path) -> None:
+        """Write the statistics from :meth:`summary` to a JSON file.
+
+        Args:
+            filename: Output file.
+        """
+        pathlib.Path(filename).write_text(json.dumps(self.summary(), indent=2))
+
+    def write_csv(self, filename: str | pathlib.Path) -> None:
+        """Write the statistics from :meth:`summary` to a CSV file.
+
+        Args:
+            filename: Output file.
+        """
+        with pathlib.Path(filename).open("w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(self.fields)
+            for name, values in self.summary().items():
+                writer.writerow([name, *(values[f] for f in self.fields[1:])])
+
+
+@contextlib.contextmanager
+def profile(collector: Collector | None = None) -> Iterator[Collector]:
+    """Collect stage timings within a block.
+
+    Args:
+        collector: Collector registered for the duration of the block. If
+          ``None``, a new :class:`StageStats` is used.
+
+    Yields:
+        Collector: The registered collector.
+    """
+    if collector is None:
+        collector = StageStats()
+    add_collector(collector)
+    try:
+        yield collector
+    finally:
+        remove_collector(collector)
@@ -0,0 +1,36 @@
+import matplotlib
+import numpy
+
+import siepic_forge as siepic
+
+matplotlib.use("Agg")
+
+
+def core(stack):
+    # The full-thickness Si extrusion is the second to last in the stack
+    _, vertices = stack[-3]
+    return vertices
+
+
+def test_cross_section():
+    technology = siepic.ebeam()
+    (stack,) = siepic.cross_section.cross_section(technology)
+    assert len(stack) == len(technology.extrusion_specs)
+    vertices = core(stack)
+    assert len(vertices) == 2
+    assert numpy.allclose(vertices[0, :, 0], [0, 0.5, 0.5, 0])
+    assert numpy.allclose(vertices[0, :, 1], [0, 0, 0.22, 0.22])
+
+    variants = [siepic.ebeam(si_mask_dilation=0.01), siepic.ebeam(sidewall_angle=10)]
+    dilated, angled = siepic.cross_section.cross_section(variants)
+    assert numpy.allclose(core(dilated)[0, :, 0], [-0.01, 0.51, 0.51, -0.01])
+    top = core(angled)[0, 2:, 0]
+    assert top[1] - top[0] < 0.5
+
+
+def test_plot_cross_section():
+    variants = [siepic.ebeam(si_thickness=t) for t in numpy.linspace(0.2, 0.24, 50)]
+    ax = siepic.plot_cross_section(variants)
+    assert len(ax.collections) == 1
+    ax = siepic.plot_cross_section()
+    assert ax.get_title() == siepic.ebeam().name
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import pathlib
+import shutil
+
+import siepic_forge as siepic
+from siepic_forge import gds_index
+
+library = pathlib.Path(siepic.__file__).parent / "library"
+
+
+def test_build_index():
+    index = gds_index.build_index(library / "GCs_BB.gds")
+    data = (library / "GCs_BB.gds").read_bytes()
+    assert index["size"] == len(data)
+    assert "GC_TE_1550_8degOxide_BB" in index["cells"]
+    for name, cell in index["cells"].items():
+        assert data[cell["start"] + 2] == gds_index._BGNSTR
+        assert data[cell["end"] - 2] == gds_index._ENDSTR
+        assert name.encode() in data[cell["start"] : cell["end"]]
+
+
+def test_index_up_to_date():
+    gds_index.clear_index()
+    index = gds_index._load_index()
+    assert set(index) == {p.stem for p in library.glob("*.gds")}
+    for libname, entry in index.items():
+        assert entry == gds_index.build_index(library / (libname + ".gds"))
+
+
+def test_read_cell(tmp_path):
+    gds_index.clear_index()
+    names = gds_index.library_cells("GCs_BB")
+    closure = gds_index.cell_closure("GCs_BB", "GC_TE_1550_8degOxide_BB")
+    assert set(closure) < set(names)
+    assert "GC_TE_1550_8degOxide_BB" in closure
+
+    stream = gds_index.read_cell("GCs_BB", "GC_TE_1550_8degOxide_BB")
+    assert len(stream) < (library / "GCs_BB.gds").stat().st_size
+    partial = tmp_path / "partial.gds"
+    partial.write_bytes(stream)
+    assert list(gds_index.build_index(partial)["cells"]) == closure
+
+    assert gds_index.read_cell("GCs_BB", "missing") is None
+    assert gds_index.read_cell("missing", "GC_TE_1550_8degOxide_BB") is None
+
+
+def test_read_cell_modified_library(tmp_path, monkeypatch):
+    gds_index.clear_index()
+    data = bytearray((library / "GCs_BB.gds").read_bytes())
+    cells = gds_index._load_index()["GCs_BB"]["cells"]
+
+    # Same size, different contents in a cell that is not read
+    other = cells["GC_TE_1310_8degOxide_BB"]
+    data[other["end"] - 5] ^= 0xFF
+    (tmp_path / "GCs_BB.gds").write_bytes(data)
+    monkeypatch.setattr(gds_index, "_library_path", tmp_path)
+    assert gds_index.read_cell("GCs_BB", "GC_TE_1550_8degOxide_BB") is None
+
+    gds_index.clear_index()
+
+
+def test_read_cell_verification(tmp_path, monkeypatch):
+    shutil.copy(library / "GCs_BB.gds", tmp_path / "GCs_BB.gds")
+    monkeypatch.setattr(gds_index, "_library_path", tmp_path)
+    monkeypatch.setattr(gds_index, "_verified_path", tmp_path / "cache" / "verified.json")
+    gds_index.clear_index()
+
+    hashed = []
+    sha256 = hashlib.sha256
+    monkeypatch.setattr(hashlib, "sha256", lambda data=b"": hashed.append(1) or sha256(data))
+
+    assert gds_index.read_cell("GCs_BB", "GC_TE_1550_8degOxide_BB") is not None
+    assert len(hashed) == 1
+
+    # New sessions use the stored verification instead of hashing the file again
+    gds_index.clear_index()
+    assert gds_index.read_cell("GCs_BB", "GC_TE_1550_8degOxide_BB") is not None
+    assert len(hashed) == 1
+
+    # Changed metadata triggers a new verification
+    stat = (tmp_path / "GCs_BB.gds").stat()
+    os.utime(tmp_path / "GCs_BB.gds", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    gds_index.clear_index()
+    assert gds_index.read_cell("GCs_BB", "GC_TE_1550_8degOxide_BB") is not None
+    assert len(hashed) == 2
+
+    gds_index.clear_index()
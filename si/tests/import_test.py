@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+# Cumulative import time budget for the package (in μs). Importing photonforge or tidy3d takes
+# several seconds, so any regression in lazy loading will break this budget.
+IMPORT_TIME_BUDGET = 100000
+
+_script = """
+import sys
+import siepic_forge
+assert len(siepic_forge.component_names) > 0
+assert "photonforge" not in sys.modules
+assert "tidy3d" not in sys.modules
+"""
+
+
+def test_import_time():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = None
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == "siepic_forge":
+            cumulative = int(fields[1])
+    assert cumulative is not None
+    assert cumulative < IMPORT_TIME_BUDGET
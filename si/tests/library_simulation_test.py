@@ -0,0 +1,78 @@
+import importlib
+
+import numpy
+import photonforge as pf
+
+import siepic_forge as siepic
+
+
+class StandInSolver:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, component, frequencies):
+        self.calls.append(component.name)
+        elements = {
+            (f"{i}@0", f"{j}@0"): numpy.full(len(frequencies), 0.5)
+            for i in component.ports
+            for j in component.ports
+        }
+        return pf.SMatrix(frequencies, elements, component.ports)
+
+
+def test_simulate_library(tmp_path):
+    technology = siepic.ebeam()
+    names = ["ebeam_y_1550", "ebeam_bdc_te1550", "ebeam_terminator_te1550"]
+    frequencies = pf.C_0 / numpy.linspace(1.5, 1.6, 5)
+    solver = StandInSolver()
+    result = siepic.simulate_library(
+        technology, names, frequencies, max_concurrency=1, output=tmp_path, solver=solver
+    )
+    assert list(result) == names
+    assert sorted(solver.calls) == sorted(names)
+
+    # Largest jobs first
+    costs = [
+        siepic.library_simulation.estimated_cost(siepic.component(n, technology))
+        for n in solver.calls
+    ]
+    assert costs == sorted(costs, reverse=True)
+
+    # Resume from the stored results
+    solver = StandInSolver()
+    resumed = siepic.simulate_library(
+        technology, names, frequencies, output=tmp_path, solver=solver, progress=False
+    )
+    assert solver.calls == []
+    for name in names:
+        assert numpy.allclose(resumed[name]["P0@0", "P0@0"], result[name]["P0@0", "P0@0"])
+
+
+def test_simulate_library_duplicates(monkeypatch):
+    technology = siepic.ebeam()
+    library = {
+        "ebeam_y_1550": siepic.component("ebeam_y_1550", technology),
+        "copy": siepic.component("ebeam_y_1550", technology),
+    }
+    library["copy"].name = "copy"
+    module = importlib.import_module("siepic_forge.library_simulation")
+    monkeypatch.setattr(module, "components", lambda *args, **kwargs: library)
+
+    # Identical cells with different names are simulated only once
+    frequencies = pf.C_0 / numpy.linspace(1.5, 1.6, 5)
+    solver = StandInSolver()
+    result = siepic.simulate_library(
+        technology, frequencies=frequencies, solver=solver, progress=False
+    )
+    assert solver.calls == ["ebeam_y_1550"]
+    assert result["copy"] is result["ebeam_y_1550"]
+
+
+def test_design_frequencies():
+    frequencies = siepic.library_simulation.design_frequencies("ebeam_y_1310", 11)
+    assert len(frequencies) == 11
+    assert numpy.allclose(pf.C_0 / frequencies[[0, -1]], (1.26, 1.36))
+
+    # Design wavelength from the port specifications
+    frequencies = siepic.library_simulation.design_frequencies("ebeam_crossing4")
+    assert numpy.allclose(pf.C_0 / frequencies[[0, -1]], (1.5, 1.6))
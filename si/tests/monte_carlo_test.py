@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import siepic_forge as siepic
+
+
+def port_count(components, parameters):
+    return {name: len(c.ports) for name, c in components.items()}
+
+
+def test_draw_samples():
+    samples = siepic.monte_carlo.draw_samples(50, seed=1)
+    assert samples == siepic.monte_carlo.draw_samples(50, seed=1)
+    assert samples != siepic.monte_carlo.draw_samples(50, seed=2)
+    assert all(set(s) == {"si_thickness"} for s in samples)
+    assert len({s["si_thickness"] for s in samples}) > 1
+
+
+def test_run(tmp_path):
+    output = tmp_path / "results.jsonl"
+    summary = siepic.monte_carlo.run(
+        port_count, ["ebeam_y_1550"], 20, output, seed=0, decimals=3, max_workers=2
+    )
+    assert summary.samples == 20
+    assert summary.evaluations < 20
+
+    records = list(siepic.monte_carlo.load_results(output))
+    assert [r["sample"] for r in records] == list(range(20))
+    assert [r["parameters"] for r in records] == siepic.monte_carlo.draw_samples(
+        20, seed=0, decimals=3
+    )
+    assert all(r["result"] == {"ebeam_y_1550": 3} for r in records)
+
+    serial = tmp_path / "serial.jsonl"
+    siepic.monte_carlo.run(
+        port_count, ["ebeam_y_1550"], 20, serial, seed=0, decimals=3, max_workers=0
+    )
+    assert serial.read_text() == output.read_text()
+
+
+def test_bounded_map():
+    lock = threading.Lock()
+    submitted = []
+    consumed = []
+
+    def square(x):
+        with lock:
+            submitted.append(x)
+        return x * x
+
+    with ThreadPoolExecutor(2) as executor:
+        for result in siepic.monte_carlo._bounded_map(executor, square, range(20), 3):
+            consumed.append(result)
+            with lock:
+                assert len(submitted) <= len(consumed) + 3
+    assert consumed == [x * x for x in range(20)]
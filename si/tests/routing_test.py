@@ -0,0 +1,60 @@
+import numpy
+import photonforge as pf
+import pytest
+
+import siepic_forge as siepic
+
+
+def test_route_polygons():
+    technology = siepic.ebeam()
+    waypoints = numpy.zeros((3, 2, 2))
+    waypoints[:, 1, 0] = 10
+    waypoints[:, :, 1] = numpy.arange(3)[:, None] * 5
+
+    layers = siepic.route_polygons(waypoints, "Rib_TE_1550_500", technology)
+    assert set(layers) == {(1, 0), (2, 0)}
+    assert len(layers[(1, 0)]) == 3
+    (x_min, y_min), (x_max, y_max) = layers[(1, 0)][1].bounds()
+    assert numpy.allclose((x_min, y_min, x_max, y_max), (0, 4.75, 10, 5.25))
+    (x_min, y_min), (x_max, y_max) = layers[(2, 0)][2].bounds()
+    assert numpy.allclose((x_min, y_min, x_max, y_max), (0, 8.5, 10, 11.5))
+
+    layers = siepic.route_polygons(waypoints, "Slot_TE_1550_500", technology)
+    assert len(layers[(1, 0)]) == 6
+    layers = siepic.route_polygons(waypoints, "eskid_TE_1550", technology)
+    assert len(layers[(1, 0)]) == 27
+
+    with pytest.raises(ValueError):
+        siepic.route_polygons(waypoints, "Unknown", technology)
+
+
+def test_route_bends():
+    technology = siepic.ebeam()
+    routes = [
+        [(0, 0), (10, 0), (10, 10)],
+        [(0, 20), (10, 20), (20, 20), (20, 10)],
+        [(0, -10), (20, -10)],
+    ]
+    layers = siepic.route_polygons(routes, "TE_1550_500", technology, radius=5)
+    polygons = layers[(1, 0)]
+    assert len(polygons) == 3
+
+    vertices = numpy.asarray(polygons[0].vertices)
+    distance = numpy.linalg.norm(vertices - (5, 5), axis=1)
+    bend = (vertices[:, 0] > 5 + 1e-6) & (vertices[:, 1] < 5 - 1e-6)
+    assert numpy.all(distance[bend] > 4.75 - 1e-3)
+    assert numpy.all(distance[bend] < 5.25 + 1e-3)
+    assert numpy.allclose(polygons[1].bounds(), ((0, 10), (20.25, 20.25)), atol=1e-3)
+
+    with pytest.raises(ValueError):
+        siepic.route_polygons(routes, "TE_1550_500", technology, radius=15)
+
+    # Outer profile edges must not cross the bend center
+    with pytest.raises(ValueError, match="extent"):
+        siepic.route_polygons(routes, "Rib_TE_1550_500", technology, radius=1)
+
+    c = pf.Component("Routes", technology)
+    siepic.add_routes(c, routes, "Rib_TE_1550_500", radius=5)
+    structures = c.get_structures()
+    assert len(structures[(1, 0)]) == 3
+    assert len(structures[(2, 0)]) == 3
@@ -0,0 +1,107 @@
+import subprocess
+import sys
+import types
+
+import numpy
+import photonforge as pf
+
+import siepic_forge as siepic
+
+
+def test_s_matrix_cache(monkeypatch, tmp_path):
+    cache = siepic.s_matrix_cache
+    monkeypatch.setattr(cache, "path", tmp_path)
+
+    c = siepic.component("ebeam_y_1550", technology=siepic.ebeam())
+    model = c.active_model
+    assert type(model) is cache.SiEPICTidy3DModel
+
+    frequencies = pf.C_0 / numpy.linspace(1.5, 1.6, 5)
+    k = cache.key(c, model, frequencies)
+    assert k == cache.key(c.copy(), model, frequencies)
+    assert k != cache.key(c, model, frequencies[:-1])
+    assert k != cache.key(c, cache.SiEPICTidy3DModel(port_symmetries=[]), frequencies)
+    kwargs = dict(model.parametric_kwargs)
+    kwargs["verbose"] = not kwargs.get("verbose", False)
+    assert k == cache.key(c, cache.SiEPICTidy3DModel(**kwargs), frequencies)
+    assert cache.load(k) is None
+
+    elements = {(f"{i}@0", f"{j}@0"): numpy.full(5, 0.5j) for i in c.ports for j in c.ports}
+    cache.store(k, pf.SMatrix(frequencies, elements, c.ports))
+    assert cache.info().entries == 1
+
+    # Served from the cache, without running any simulations
+    s_matrix = cache.s_matrix(c, frequencies)
+    assert s_matrix.elements.keys() == elements.keys()
+    assert numpy.allclose(s_matrix.elements[("P0@0", "P1@0")], 0.5j)
+
+    assert cache.prune(0) == 1
+    assert cache.info().entries == 0
+
+    # New results are stored after a successful run
+    runner = types.SimpleNamespace(
+        status={"progress": 100, "message": "success"},
+        s_matrix=pf.SMatrix(frequencies, elements, c.ports),
+    )
+    monkeypatch.setattr(pf.Tidy3DModel, "start", lambda *_, **__: runner)
+    cache.s_matrix(c, frequencies)
+    assert cache.info().entries == 1
+    assert cache.load(k) is not None
+
+
+def test_component_s_matrix(monkeypatch, tmp_path):
+    cache = siepic.s_matrix_cache
+    monkeypatch.setattr(cache, "path", tmp_path)
+    technology = siepic.ebeam()
+    frequencies = pf.C_0 / numpy.linspace(1.5, 1.6, 5)
+
+    reference = siepic.component("ebeam_y_1550", technology=technology)
+    elements = {
+        (f"{i}@0", f"{j}@0"): numpy.full(5, 0.5j) for i in reference.ports for j in reference.ports
+    }
+    runner = types.SimpleNamespace(
+        status={"progress": 100, "message": "success"},
+        s_matrix=pf.SMatrix(frequencies, elements, reference.ports),
+    )
+    calls = []
+    monkeypatch.setattr(pf.Tidy3DModel, "start", lambda *_, **__: calls.append(1) or runner)
+
+    s_matrix = siepic.component("ebeam_y_1550", technology=technology).s_matrix(frequencies)
+    assert len(calls) == 1
+    assert cache.info().entries == 1
+
+    # A new component instance is served from disk
+    s_matrix = siepic.component("ebeam_y_1550", technology=technology).s_matrix(frequencies)
+    assert len(calls) == 1
+    assert numpy.allclose(s_matrix.elements[("P0@0", "P1@0")], 0.5j)
+
+    # Cache disabled
+    monkeypatch.setattr(cache, "enabled", False)
+    siepic.component("ebeam_y_1550", technology=technology).s_matrix(frequencies)
+    assert len(calls) == 2
+
+
+_load_scripts = (
+    """
+import sys
+import photonforge as pf
+import siepic_forge
+pf.load_phf(sys.argv[1])
+""",
+    """
+import sys
+import siepic_forge
+import photonforge as pf
+assert "siepic_forge.s_matrix_cache" in sys.modules
+pf.load_phf(sys.argv[1])
+""",
+)
+
+
+def test_phf_without_cache_module(tmp_path):
+    # Library components can be loaded in a session that only imports the package, before or
+    # after photonforge
+    filename = tmp_path / "component.phf"
+    pf.write_phf(filename, siepic.component("ebeam_y_1550", technology=siepic.ebeam()))
+    for script in _load_scripts:
+        subprocess.run([sys.executable, "-c", script, str(filename)], check=True)
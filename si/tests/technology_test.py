@@ -1,4 +1,10 @@
+import importlib
+import inspect
+
+import numpy
 import photonforge as pf
+import pytest
+import tidy3d as td
 
 import siepic_forge as siepic
 
@@ -17,3 +23,103 @@ def test_export(tmp_path):
     assert tech_loaded == tech
 
 
+def test_memoization():
+    siepic.ebeam.cache_clear()
+    tech = siepic.ebeam(sidewall_angle=2)
+    assert siepic.ebeam(sidewall_angle=2.0) == tech
+    assert siepic.ebeam(sidewall_angle=3) != tech
+    info = siepic.ebeam.cache_info()
+    assert info.hits == 1
+    assert info.misses == 2
+    assert info.currsize == 2
+
+    assert siepic.ebeam() == siepic.ebeam(**tech.parametric_kwargs | {"sidewall_angle": 0})
+    assert siepic.ebeam.cache_info().hits == 2
+
+    uncached = siepic.ebeam(sidewall_angle=2, use_parametric_cache=False)
+    assert uncached is not tech
+    assert uncached == tech
+
+    # Technologies are only kept by the bounded cache, not by the photonforge parametric cache
+    parametric_cache = inspect.getclosurevars(siepic.ebeam.__wrapped__).nonlocals["_cache"]
+    assert len(parametric_cache) == 0
+
+    siepic.ebeam.cache_clear()
+    assert siepic.ebeam.cache_info().currsize == 0
+
+
+def test_memoization_copies():
+    siepic.ebeam.cache_clear()
+    tech = siepic.ebeam()
+    reference = siepic.ebeam(use_parametric_cache=False)
+    port_name = next(iter(tech.ports))
+
+    tech.name = "Modified"
+    tech.ports[port_name].width *= 2
+    tech.remove_port(list(tech.ports)[-1])
+    tech.extrusion_specs[0].limits = (0, 1)
+    tech.insert_extrusion_spec(0, tech.extrusion_specs[-1])
+    tech.parametric_kwargs["sidewall_angle"] = 10
+    tech.random_variables = []
+
+    assert siepic.ebeam() is not tech
+    assert siepic.ebeam() == reference
+    assert siepic.ebeam().parametric_kwargs == reference.parametric_kwargs
+    assert siepic.ebeam().random_variables == reference.random_variables
+    siepic.ebeam.cache_clear()
+
+
+def test_precompute_port_modes(monkeypatch):
+    solved = []
+
+    def port_modes(port_spec, frequencies, mesh_refinement, technology, **kwargs):
+        solved.append(port_spec)
+        return port_spec.description
+
+    monkeypatch.setattr(pf, "port_modes", port_modes)
+    tech = siepic.ebeam()
+    modes = siepic.precompute_port_modes([193e12], tech, max_workers=4)
+    assert sorted(modes) == sorted(tech.ports)
+    assert len(solved) == len(tech.ports)
+
+    modes = siepic.precompute_port_modes(
+        [193e12], tech, ["eskid_TE_1550", "MM_TE_1550_3000", "eskid_TE_1550"]
+    )
+    assert list(modes) == ["eskid_TE_1550", "MM_TE_1550_3000"]
+    assert modes["MM_TE_1550_3000"] == tech.ports["MM_TE_1550_3000"].description
+
+    with pytest.raises(ValueError):
+        siepic.precompute_port_modes([193e12], tech, ["Unknown"])
+
+
+def test_media_cache(monkeypatch, tmp_path):
+    media_cache = importlib.import_module("siepic_forge._media_cache")
+    monkeypatch.setattr(media_cache, "path", tmp_path)
+    kwargs = {
+        "conductivity": 17,
+        "frequency_range": [1e9, 10e9],
+        "fit_param": td.SurfaceImpedanceFitterParam(max_num_poles=2, frequency_sampling_points=5),
+    }
+
+    medium = media_cache.lossy_metal_medium(**kwargs)
+    assert len(list(tmp_path.iterdir())) == 0
+    model = medium.scaled_surface_impedance_model
+    assert len(list(tmp_path.iterdir())) == 1
+
+    cached = media_cache.lossy_metal_medium(**kwargs)
+    assert cached == medium
+    assert "_fitting_result" in cached._cached_properties
+    frequencies = numpy.linspace(1e9, 10e9, 11)
+    assert numpy.allclose(
+        cached.scaled_surface_impedance_model.eps_model(frequencies), model.eps_model(frequencies)
+    )
+
+    other = media_cache.lossy_metal_medium(**(kwargs | {"conductivity": 1.6}))
+    assert "_fitting_result" not in other._cached_properties
+
+    # Without the internal fit property, media are fitted normally and nothing is stored
+    monkeypatch.setattr(media_cache, "_fit_property", "_unknown_property")
+    fallback = media_cache.lossy_metal_medium(**(kwargs | {"conductivity": 2.0}))
+    assert not isinstance(fallback._cached_properties, media_cache._StoringProperties)
+    assert fallback.scaled_surface_impedance_model is not None
+    assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,136 @@
+import argparse
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import photonforge as pf
+
+import siepic_sin_forge as siepic
+
+# Relative slowdown above which a benchmark is reported as a regression
+THRESHOLD = 0.2
+
+
+def measure(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    # Peak memory is measured in a separate pass, so that tracing does not distort the timings
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "max": max(times),
+        "repeat": repeat,
+        "peak_memory": peak,
+    }
+
+
+def run(repeat):
+    results = {}
+
+    def cold_technology(**kwargs):
+        siepic.ebeam.cache_clear()
+        return siepic.ebeam(use_parametric_cache=False, **kwargs)
+
+    results["ebeam/default"] = measure(cold_technology, repeat)
+    results["ebeam/varied"] = measure(
+        lambda: [cold_technology(sidewall_angle=a) for a in range(10)], repeat
+    )
+    results["ebeam/cached"] = measure(lambda: siepic.ebeam(), repeat)
+
+    technology = siepic.ebeam()
+
+    def cold_component(name):
+        siepic.clear_cache()
+        return siepic.component(name, technology)
+
+    for name in sorted(siepic.component_names):
+        results[f"component/{name}"] = measure(lambda n=name: cold_component(n), repeat)
+        results[f"component/{name}/cached"] = measure(
+            lambda n=name: siepic.component(n, technology), repeat
+        )
+
+    def cold_library():
+        siepic.clear_cache()
+        return [siepic.component(name, technology) for name in siepic.component_names]
+
+    def cold_bulk_library():
+        siepic.clear_cache()
+        return siepic.components(technology=technology)
+
+    results["library/component"] = measure(cold_library, repeat)
+    results["library/components"] = measure(cold_bulk_library, repeat)
+
+    library = list(siepic.components(technology=technology).values())
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        technology_file = pathlib.Path(tmp_dir) / "technology.phf"
+        library_file = pathlib.Path(tmp_dir) / "library.phf"
+        results["phf/technology"] = measure(
+            lambda: (pf.write_phf(technology_file, technology), pf.load_phf(technology_file)),
+            repeat,
+        )
+        results["phf/library"] = measure(
+            lambda: (pf.write_phf(library_file, *library), pf.load_phf(library_file)), repeat
+        )
+
+    return results
+
+
+def compare(results, reference):
+    regressions = []
+    for key, value in sorted(results.items()):
+        previous = reference.get(key)
+        if previous is None:
+            continue
+        ratio = value["median"] / previous["median"] - 1
+        flag = ""
+        if ratio > THRESHOLD:
+            flag = " <- REGRESSION"
+            regressions.append(key)
+        print(f"{key}: {previous['median']:.6f} s -> {value['median']:.6f} s ({ratio:+.1%}){flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Benchmarks for {siepic.__name__}")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Repetitions per benchmark")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="Output JSON file")
+    parser.add_argument("-c", "--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", RuntimeWarning)
+    results = run(args.repeat)
+
+    output = {
+        "package": siepic.__name__,
+        "version": siepic.__version__,
+        "photonforge": pf.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    pathlib.Path(args.output).write_text(json.dumps(output, indent=2))
+
+    for key, value in results.items():
+        print(f"{key}: {value['median']:.6f} s (peak memory: {value['peak_memory']} B)")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        reference = json.loads(pathlib.Path(args.compare).read_text())["results"]
+        if len(compare(results, reference)) > 0:
+            sys.exit(1)
@@ -0,0 +1,8 @@
+import pathlib
+
+import siepic_sin_forge as siepic
+
+if __name__ == "__main__":
+    output = pathlib.Path(__file__).parent / "siepic_sin_forge" / "library" / "components.phf"
+    print(f"Writing component bundle to {output}", flush=True)
+    siepic.write_bundle(output)
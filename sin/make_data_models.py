@@ -0,0 +1,25 @@
+import argparse
+import pathlib
+
+import siepic_sin_forge as siepic
+from siepic_sin_forge.s_matrix_cache import _write_s_matrix
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compute the tabulated S matrix data used by component(model='data')"
+    )
+    parser.add_argument("names", nargs="*", help="Components to compute (default: all)")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    output = pathlib.Path(__file__).parent / "siepic_sin_forge" / "library" / "s_matrix"
+    output.mkdir(exist_ok=True)
+
+    # Each component is computed over the band of its own design wavelength
+    results = siepic.simulate_library(
+        names=args.names or None, max_concurrency=args.max_concurrency
+    )
+    for name, s_matrix in results.items():
+        _write_s_matrix(output / f"{name}.npz", s_matrix)
+
+    print(f"Data for {len(results)} components written to {output}")
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import pathlib
+
+import tidy3d as td
+
+from .instrumentation import stage
+
+# Shared by all SiEPIC forge packages, which use the same metal media
+path = pathlib.Path(
+    os.environ.get(
+        "SIEPIC_FORGE_MEDIA_CACHE", pathlib.Path.home() / ".cache" / "siepic_forge" / "media"
+    )
+)
+
+
+# Private cached property of td.LossyMetalMedium that holds the surface impedance fit. The disk
+# cache is only used when it is present, so changes in Tidy3D fall back to the regular fitting.
+_fit_property = "_fitting_result"
+
+
+class _StoringProperties(dict):
+    # Replaces the cached properties of a medium to store the surface impedance fit once computed
+    def __init__(self, filename: pathlib.Path, properties: dict) -> None:
+        super().__init__(properties)
+        self.filename = filename
+
+    def __setitem__(self, key: str, value: object) -> None:
+        super().__setitem__(key, value)
+        if key == _fit_property:
+            try:
+                model, error = value
+                data = {"model": model.model_dump(mode="json"), "error": float(error)}
+            except (TypeError, ValueError, AttributeError):
+                return
+            tmp = self.filename.with_name(self.filename.name + f".{os.getpid()}.tmp")
+            try:
+                self.filename.parent.mkdir(parents=True, exist_ok=True)
+                tmp.write_text(json.dumps(data))
+                os.replace(tmp, self.filename)
+            except OSError:
+                tmp.unlink(missing_ok=True)
+
+
+def lossy_metal_medium(**kwargs: object) -> td.LossyMetalMedium:
+    """Create a LossyMetalMedium with a persistent surface impedance fit.
+
+    The pole-residue fit computed by Tidy3D is stored on disk, keyed by all
+    medium parameters (conductivity, frequency range, fit parameters, etc.)
+    and the Tidy3D version. Media created later with the same parameters,
+    in any process, load the stored fit instead of repeating it.
+
+    The fit is read from Tidy3D's internal property cache, so stored fits
+    are only reused by the exact Tidy3D version that created them. If the
+    internal cache is not found, the medium is fitted normally.
+    """
+    with stage("ebeam.materials"):
+        medium = td.LossyMetalMedium(**kwargs)
+        properties = getattr(medium, "_cached_properties", None)
+        if not isinstance(properties, dict) or not hasattr(type(medium), _fit_property):
+            return medium
+
+        key = hashlib.sha256((td.__version__ + medium.model_dump_json()).encode()).hexdigest()
+        filename = pathlib.Path(path) / f"{key}.json"
+        try:
+            data = json.loads(filename.read_text())
+            model = td.PoleResidue.model_validate(data["model"])
+            properties[_fit_property] = (model, float(data["error"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            medium._cached_properties = _StoringProperties(filename, properties)
+        return medium
@@ -0,0 +1,246 @@
+"""Lightweight cross-section renderer for the technology extrusion stack.
+
+The 2D stack is computed directly from ``technology.extrusion_specs``: the
+mask layers of each extrusion are intersected with a cut line through the
+component, the mask dilation is applied to the resulting intervals, and the
+intervals are extruded to the specification z-range with the sidewall
+angle. No Tidy3D scene is built, so many technology variants can be drawn
+in a single figure quickly.
+
+Masks are evaluated as the union of their layers, which covers the mask
+specifications used in :func:`ebeam`.
+
+Example:
+    >>> thicknesses = numpy.linspace(0.38, 0.42, 50)
+    >>> variants = [ebeam(sin_thickness=t) for t in thicknesses]  # doctest: +SKIP
+    >>> ax = plot_cross_section(variants)  # doctest: +SKIP
+"""
+
+from collections.abc import Sequence
+
+import numpy
+import photonforge as pf
+from matplotlib import pyplot
+from matplotlib.collections import PolyCollection
+from matplotlib.patches import Patch
+
+from .technology import ebeam
+
+
+def _test_component(technology: pf.Technology) -> pf.Component:
+    c = pf.Component("Extrusion test", technology)
+    c.add(
+        "SiN",
+        pf.Rectangle((-0.5, -1), (1, 1)),
+        "Oxide open to BOX",
+        pf.Rectangle((-2, -1), (2.5, 1)),
+        "SiN",
+        pf.Rectangle((4, -1), (5.5, 1)),
+        "M1_heater",
+        pf.Rectangle((6, -1), (12, 1)),
+        "M2_router",
+        pf.Rectangle((8, -1), (12, 1)),
+        "M_Open",
+        pf.Rectangle((9, -1), (11, 1)),
+        "Deep Trench",
+        pf.Rectangle((15, -1), (20, 1)),
+    )
+    return c
+
+
+def _rings(structure: object) -> list[numpy.ndarray]:
+    if isinstance(structure, pf.Polygon):
+        holes = getattr(structure, "holes", [])
+        return [numpy.asarray(structure.vertices), *(numpy.asarray(h) for h in holes)]
+    return [ring for p in pf.boolean([structure], [], "+") for ring in _rings(p)]
+
+
+def _merge(intervals: numpy.ndarray) -> numpy.ndarray:
+    intervals = intervals[intervals[:, 1] > intervals[:, 0]]
+    if len(intervals) == 0:
+        return intervals
+    intervals = intervals[numpy.argsort(intervals[:, 0])]
+    ends = numpy.maximum.accumulate(intervals[:, 1])
+    first = numpy.concatenate(([True], intervals[1:, 0] > ends[:-1]))
+    last = numpy.concatenate((first[1:], [True]))
+    return numpy.column_stack((intervals[first, 0], ends[last]))
+
+
+def _cut_intervals(structures: list, position: float, axis: int) -> numpy.ndarray:
+    # Intervals where the cut line at the given position along axis is inside the structures
+    intervals = []
+    for structure in structures:
+        crossings = []
+        for ring in _rings(structure):
+            a = ring
+            b = numpy.roll(ring, -1, axis=0)
+            fa = a[:, axis] - position
+            fb = b[:, axis] - position
+            crossing = (fa <= 0) != (fb <= 0)
+            t = fa[crossing] / (fa[crossing] - fb[crossing])
+            u = a[crossing, 1 - axis] + t * (b[crossing, 1 - axis] - a[crossing, 1 - axis])
+            crossings.append(u)
+        crossings = numpy.sort(numpy.concatenate(crossings))
+        intervals.append(crossings.reshape(-1, 2))
+    if len(intervals) == 0:
+        return numpy.empty((0, 2))
+    return _merge(numpy.vstack(intervals))
+
+
+def _medium_name(medium: object) -> str:
+    if isinstance(medium, dict):
+        medium = medium.get("optical", next(iter(medium.values()), None))
+    return getattr(medium, "name", None) or type(medium).__name__
+
+
+def cross_section(
+    technology: pf.Technology | Sequence[pf.Technology] | None = None,
+    component: pf.Component | None = None,
+    x: float | None = None,
+    y: float | None = None,
+) -> list[list[tuple[str, numpy.ndarray]]]:
+    """Compute the extrusion stack of a component along a cut line.
+
+    The mask intervals along the cut are computed once and shared by all
+    technology variants, which only change dilations, z-ranges and
+    sidewall angles.
+
+    Args:
+        technology: Technology or sequence of technology variants. If
+          ``None``, the default :func:`ebeam` technology is used.
+        component: Component to cut. If ``None``, a test component with all
+          extruded layers is used.
+        x: Position of a cut line parallel to the y axis.
+        y: Position of a cut line parallel to the x axis. Used if ``x`` is
+          ``None``, with a default of 0.
+
+    Returns:
+        list[list[tuple[str, numpy.ndarray]]]: For each technology, the
+        medium name and the (N, 4, 2) array of trapezoid vertices (in-plane
+        coordinate and z) for each extrusion specification, in extrusion
+        order.
+    """
+    if technology is None:
+        technology = ebeam()
+    technologies = [technology] if isinstance(technology, pf.Technology) else list(technology)
+    if component is None:
+        component = _test_component(technologies[0])
+
+    if x is None:
+        axis, position = 1, 0.0 if y is None else y
+    else:
+        axis, position = 0, x
+    (x_min, y_min), (x_max, y_max) = component.bounds()
+    u_min, u_max = (x_min, x_max) if axis == 1 else (y_min, y_max)
+    margin = 0.1 * (u_max - u_min)
+    u_min -= margin
+    u_max += margin
+
+    finite = [
+        z
+        for t in technologies
+        for spec in t.extrusion_specs
+        for z in spec.limits
+        if abs(z) < pf.Z_INF
+    ]
+    z_margin = 0.1 * (max(finite) - min(finite)) if len(finite) > 0 else 1.0
+    z_min = min(finite, default=0.0) - z_margin
+    z_max = max(finite, default=0.0) + z_margin
+
+    structures = component.get_structures()
+    base = {}
+    result = []
+    for t in technologies:
+        stack = []
+        for spec in t.extrusion_specs:
+            layers = tuple(sorted(spec.mask_spec.get_layers()))
+            if layers not in base:
+                if len(layers) == 0:
+                    base[layers] = numpy.array([[u_min, u_max]])
+                else:
+                    selected = [s for layer in layers for s in structures.get(layer, [])]
+                    base[layers] = _cut_intervals(selected, position, axis)
+            intervals = base[layers]
+
+            dilation = getattr(spec.mask_spec, "dilation", 0.0) if len(layers) > 0 else 0.0
+            if dilation != 0 and len(intervals) > 0:
+                intervals = _merge(intervals + numpy.array([-dilation, dilation]))
+
+            z0, z1 = numpy.clip(spec.limits, z_min, z_max)
+            offset = (z1 - z0) * numpy.tan(numpy.radians(getattr(spec, "sidewall_angle", 0.0)))
+            lower = intervals
+            upper = intervals + numpy.array([offset, -offset])
+            collapsed = upper[:, 0] > upper[:, 1]
+            upper[collapsed] = upper[collapsed].mean(axis=1, keepdims=True)
+
+            vertices = numpy.empty((len(intervals), 4, 2))
+            vertices[:, 0] = numpy.column_stack((lower[:, 0], numpy.full(len(lower), z0)))
+            vertices[:, 1] = numpy.column_stack((lower[:, 1], numpy.full(len(lower), z0)))
+            vertices[:, 2] = numpy.column_stack((upper[:, 1], numpy.full(len(upper), z1)))
+            vertices[:, 3] = numpy.column_stack((upper[:, 0], numpy.full(len(upper), z1)))
+            vertices[:, :, 0] = numpy.clip(vertices[:, :, 0], u_min, u_max)
+            stack.append((_medium_name(spec.medium), vertices))
+        result.append(stack)
+    return result
+
+
+def plot_cross_section(
+    technology: pf.Technology | Sequence[pf.Technology] | None = None,
+    component: pf.Component | None = None,
+    x: float | None = None,
+    y: float | None = None,
+    ax: object | None = None,
+    gap: float = 1.0,
+) -> object:
+    """Plot the extrusion stack of a component along a cut line.
+
+    Multiple technology variants are drawn side by side in the same axes.
+
+    Args:
+        technology: Technology or sequence of technology variants. If
+          ``None``, the default :func:`ebeam` technology is used.
+        component: Component to cut. If ``None``, a test component with all
+          extruded layers is used.
+        x: Position of a cut line parallel to the y axis.
+        y: Position of a cut line parallel to the x axis. Used if ``x`` is
+          ``None``, with a default of 0.
+        ax: Matplotlib axes. If ``None``, new axes are created.
+        gap: Horizontal gap between technology variants.
+
+    Returns:
+        Matplotlib axes with the plot.
+    """
+    if technology is None:
+        technology = ebeam()
+    technologies = [technology] if isinstance(technology, pf.Technology) else list(technology)
+    stacks = cross_section(technologies, component, x, y)
+
+    polygons = []
+    names = []
+    width = None
+    for i, stack in enumerate(stacks):
+        for name, vertices in stack:
+            if width is None and len(vertices) > 0:
+                width = vertices[:, :, 0].max() - vertices[:, :, 0].min()
+            shifted = vertices.copy()
+            shifted[:, :, 0] += i * ((width or 0.0) + gap)
+            polygons.extend(shifted)
+            names.extend([name] * len(shifted))
+
+    colors = {}
+    cycle = pyplot.rcParams["axes.prop_cycle"].by_key()["color"]
+    for name in names:
+        if name not in colors:
+            colors[name] = cycle[len(colors) % len(cycle)]
+
+    if ax is None:
+        _, ax = pyplot.subplots()
+    ax.add_collection(
+        PolyCollection(polygons, facecolors=[colors[n] for n in names], edgecolors="none")
+    )
+    ax.autoscale_view()
+    ax.legend(handles=[Patch(color=c, label=n) for n, c in colors.items()], loc="upper right")
+    ax.set(xlabel="y (μm)" if x is not None else "x (μm)", ylabel="z (μm)")
+    if len(technologies) == 1:
+        ax.set(title=technologies[0].name)
+    return ax
@@ -0,0 +1,232 @@
+"""Per-cell byte-offset index for the library GDSII files.
+
+The index records, for each cell in a library file, the byte range of its
+structure records and the cells it references. With it, a single cell and
+its dependencies are read from a memory-mapped file without parsing the rest
+of the stream.
+
+The index is created at build time with ``python make_gds_index.py`` and
+stored in ``library/gds_index.json``. Library files that do not match their
+index entry (by content hash) are read in full. Verified files are recorded
+with their size and modification time in the user cache directory, so each
+file is hashed only once, unless that metadata changes.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import tempfile
+
+try:
+    from importlib.resources import as_file, files
+except ImportError:
+    from importlib_resources import as_file, files
+
+_ENDLIB = 0x04
+_BGNSTR = 0x05
+_STRNAME = 0x06
+_ENDSTR = 0x07
+_SNAME = 0x12
+
+_endlib_record = b"\x00\x04\x04\x00"
+
+_library_path = files("siepic_sin_forge") / "library"
+_index_path = _library_path / "gds_index.json"
+_index = None
+
+# Library files verified against the index: path -> [size, mtime_ns, index sha256]
+_verified_path = pathlib.Path.home() / ".cache" / "siepic_sin_forge" / "gds_index_verified.json"
+_verified = None
+
+
+def _string(data: bytes) -> str:
+    return data.rstrip(b"\0").decode("ascii")
+
+
+def build_index(filename: str | pathlib.Path) -> dict:
+    """Scan the records of a GDSII file and index its cells.
+
+    Args:
+        filename: GDSII file.
+
+    Returns:
+        dict: Index with the file ``"size"`` and ``"sha256"`` digest, the
+        ``"header"`` length (bytes before the first cell) and, in
+        ``"cells"``, the ``"start"`` and ``"end"`` offsets and
+        ``"dependencies"`` of each cell.
+    """
+    data = pathlib.Path(filename).read_bytes()
+    cells = {}
+    header = None
+    position = 0
+    while position + 4 <= len(data):
+        length = int.from_bytes(data[position : position + 2], "big")
+        record = data[position + 2]
+        if length < 4:
+            raise ValueError(f"Invalid GDSII record at byte {position} in {filename}.")
+        if record == _BGNSTR:
+            if header is None:
+                header = position
+            start = position
+            dependencies = set()
+        elif record == _STRNAME:
+            name = _string(data[position + 4 : position + length])
+        elif record == _SNAME:
+            dependencies.add(_string(data[position + 4 : position + length]))
+        elif record == _ENDSTR:
+            cells[name] = {
+                "start": start,
+                "end": position + length,
+                "dependencies": sorted(dependencies),
+            }
+        elif record == _ENDLIB:
+            break
+        position += length
+    return {
+        "size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "header": position if header is None else header,
+        "cells": cells,
+    }
+
+
+def write_index(output: str | pathlib.Path, library: str | pathlib.Path) -> None:
+    """Index all GDSII files in a library directory.
+
+    Args:
+        output: Output JSON file.
+        library: Directory with the library files.
+    """
+    index = {p.stem: build_index(p) for p in sorted(pathlib.Path(library).glob("*.gds"))}
+    pathlib.Path(output).write_text(json.dumps(index, indent=1, sort_keys=True))
+
+
+def _load_index() -> dict:
+    global _index
+    if _index is None:
+        try:
+            _index = json.loads(_index_path.read_text())
+        except (OSError, ValueError):
+            _index = {}
+    return _index
+
+
+def library_cells(libname: str) -> list[str]:
+    """Names of the indexed cells in a library file.
+
+    Args:
+        libname: Library file name, without extension.
+
+    Returns:
+        list[str]: Cell names in file order.
+    """
+    cells = _load_index().get(libname, {}).get("cells", {})
+    return sorted(cells, key=lambda name: cells[name]["start"])
+
+
+def cell_closure(libname: str, cell_name: str) -> list[str] | None:
+    """Names of a cell and all its dependencies, in file order.
+
+    Args:
+        libname: Library file name, without extension.
+        cell_name: Cell name.
+
+    Returns:
+        list[str]: Cell names, or ``None`` if the cell is not indexed.
+    """
+    cells = _load_index().get(libname, {}).get("cells", {})
+    if cell_name not in cells:
+        return None
+    closure = set()
+    pending = [cell_name]
+    while pending:
+        name = pending.pop()
+        if name in closure:
+            continue
+        if name not in cells:
+            return None
+        closure.add(name)
+        pending.extend(cells[name]["dependencies"])
+    return sorted(closure, key=lambda name: cells[name]["start"])
+
+
+def _load_verified() -> dict:
+    global _verified
+    if _verified is None:
+        try:
+            _verified = json.loads(_verified_path.read_text())
+        except (OSError, ValueError):
+            _verified = {}
+    return _verified
+
+
+def _store_verified(verified: dict) -> None:
+    # Write to a temporary file first, so that concurrent readers never see partial records
+    try:
+        _verified_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=_verified_path.parent, suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w") as tmp:
+            json.dump(verified, tmp)
+        os.replace(tmp_name, _verified_path)
+    except OSError:
+        pathlib.Path(tmp_name).unlink(missing_ok=True)
+
+
+def _matches_index(filename: str, data: mmap.mmap, entry: dict) -> bool:
+    if len(data) != entry["size"]:
+        return False
+    # The contents are only hashed when the file metadata differs from the last verification
+    stat = os.stat(filename)
+    token = [stat.st_size, stat.st_mtime_ns, entry.get("sha256")]
+    verified = _load_verified()
+    if verified.get(str(filename)) != token:
+        if hashlib.sha256(data).hexdigest() != entry.get("sha256"):
+            return False
+        verified[str(filename)] = token
+        _store_verified(dict(verified))
+    return True
+
+
+def read_cell(libname: str, cell_name: str) -> bytes | None:
+    """Read a cell and its dependencies as a standalone GDSII stream.
+
+    Only the library header and the records of the required cells are read
+    from the memory-mapped library file.
+
+    Args:
+        libname: Library file name, without extension.
+        cell_name: Cell name.
+
+    Returns:
+        bytes: GDSII stream, or ``None`` if the cell is not indexed or the
+        index does not match the library file.
+    """
+    closure = cell_closure(libname, cell_name)
+    if closure is None:
+        return None
+    entry = _load_index()[libname]
+    cells = entry["cells"]
+
+    with (
+        as_file(_library_path / (libname + ".gds")) as filename,
+        open(filename, "rb") as file,
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data,
+    ):
+        if not _matches_index(filename, data, entry):
+            return None
+        chunks = [data[: entry["header"]]]
+        chunks.extend(data[cells[name]["start"] : cells[name]["end"]] for name in closure)
+    chunks.append(_endlib_record)
+    return b"".join(chunks)
+
+
+def clear_index() -> None:
+    """Discard the loaded index, so that it is read again on the next use."""
+    global _index, _verified
+    _index = None
+    _verified = None
@@ -0,0 +1,274 @@
+"""S matrix models interpolated over a grid of process parameters.
+
+A :class:`ProcessGridModel` is built from S matrices simulated at the nodes
+of a coarse grid of technology parameters (for example, ``sin_thickness``
+and ``sidewall_angle``). The S matrix of a component is then interpolated
+multilinearly (in magnitude and unwrapped phase) at the parameter values of
+the component technology, and in frequency, without running new
+simulations. Monte Carlo and corner studies can evaluate many samples from
+a single grid.
+
+The interpolation error is estimated from the curvature of the magnitude
+and phase of the simulated data along each parameter axis.
+
+Example:
+    >>> grid = {"sin_thickness": [0.39, 0.40, 0.41], "sidewall_angle": [0, 5]}
+    >>> model = build_grid_model("ebeam_YBranch_895", grid, frequencies)  # doctest: +SKIP
+    >>> model.save("ebeam_YBranch_895_grid.npz")  # doctest: +SKIP
+    >>> c = component("ebeam_YBranch_895", ebeam(sin_thickness=0.397))  # doctest: +SKIP
+    >>> c.add_model(model, "Grid")  # doctest: +SKIP
+    >>> s_matrix = c.s_matrix(frequencies)  # doctest: +SKIP
+"""
+
+import io
+import itertools
+import pathlib
+import warnings
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+import photonforge as pf
+
+from .library_simulation import simulate_library
+from .technology import ebeam
+
+
+class ProcessGridModel(pf.Model):
+    """S matrix model interpolated over a grid of technology parameters.
+
+    Args:
+        grid: Parameter names and the sorted values of each grid axis.
+        frequencies: Frequencies of the simulated S matrices.
+        names: S matrix element keys, as ``(input, output)`` port-mode
+          pairs.
+        values: Complex S matrix elements with shape
+          ``(*grid_shape, len(names), len(frequencies))``.
+        parameters: Fixed parameter values used instead of the ones from the
+          component technology.
+    """
+
+    def __init__(
+        self,
+        grid: dict[str, Sequence[float]],
+        frequencies: Sequence[float],
+        names: Sequence[tuple[str, str]],
+        values: numpy.ndarray,
+        parameters: dict[str, float] = {},
+    ) -> None:
+        super().__init__(parameters=dict(parameters))
+        self.grid = {k: numpy.array(v, dtype=float) for k, v in grid.items()}
+        self.frequencies = numpy.array(frequencies, dtype=float)
+        self.names = [tuple(n) for n in names]
+        self.values = numpy.asarray(values, dtype=complex)
+        self.parameters = dict(parameters)
+
+        shape = (*(len(v) for v in self.grid.values()), len(self.names), len(self.frequencies))
+        if self.values.shape != shape:
+            raise ValueError(f"Argument 'values' must have shape {shape}.")
+        for name, axis in self.grid.items():
+            if numpy.any(numpy.diff(axis) <= 0):
+                raise ValueError(f"Grid values for {name!r} must be strictly increasing.")
+
+    @property
+    def error_estimate(self) -> dict[str, float]:
+        """Estimated maximal interpolation error along each parameter axis.
+
+        The linear interpolation error between nodes is bounded by 1/8 of
+        the second difference of the interpolated quantity. The estimate
+        combines the second differences of the magnitude and of the
+        unwrapped phase (scaled by the magnitude). Axes with fewer than 3
+        nodes have no estimate (``nan``).
+        """
+        magnitude = numpy.abs(self.values)
+        result = {}
+        for axis, name in enumerate(self.grid):
+            if self.values.shape[axis] < 3:
+                result[name] = float("nan")
+            else:
+                phase = numpy.unwrap(numpy.angle(self.values), axis=axis)
+                second = numpy.abs(numpy.diff(magnitude, n=2, axis=axis))
+                second += magnitude.max(axis=axis, keepdims=True) * numpy.abs(
+                    numpy.diff(phase, n=2, axis=axis)
+                )
+                result[name] = float(second.max() / 8)
+        return result
+
+    def interpolate(
+        self, frequencies: Sequence[float], parameters: dict[str, float]
+    ) -> dict[tuple[str, str], numpy.ndarray]:
+        """Interpolate the S matrix elements at a parameter point.
+
+        Args:
+            frequencies: Frequencies for the interpolated elements.
+            parameters: Values of all grid parameters.
+
+        Returns:
+            dict[tuple[str, str], numpy.ndarray]: S matrix elements.
+        """
+        values = self.values
+        for name, axis in self.grid.items():
+            x = float(parameters[name])
+            if len(axis) == 1:
+                values = values[0]
+                continue
+            if x < axis[0] or x > axis[-1]:
+                warnings.warn(
+                    f"Parameter {name!r} value {x} is outside of the model grid "
+                    f"[{axis[0]}, {axis[-1]}]. The result is extrapolated.",
+                    RuntimeWarning,
+                    3,
+                )
+            i = int(numpy.clip(numpy.searchsorted(axis, x) - 1, 0, len(axis) - 2))
+            w = (x - axis[i]) / (axis[i + 1] - axis[i])
+
+            # Magnitude and unwrapped phase are interpolated separately, as in frequency
+            v0 = values[i]
+            v1 = values[i + 1]
+            magnitude = (1 - w) * numpy.abs(v0) + w * numpy.abs(v1)
+            phase = numpy.angle(v0) + w * numpy.angle(v1 * numpy.conj(v0))
+            values = magnitude * numpy.exp(1j * phase)
+
+        frequencies = numpy.asarray(frequencies, dtype=float)
+        if frequencies.shape != self.frequencies.shape or not numpy.allclose(
+            frequencies, self.frequencies
+        ):
+            # Magnitude and unwrapped phase are interpolated separately
+            order = numpy.argsort(self.frequencies)
+            f = self.frequencies[order]
+            magnitude = numpy.abs(values[:, order])
+            phase = numpy.unwrap(numpy.angle(values[:, order]), axis=1)
+            values = numpy.array([numpy.interp(frequencies, f, m) for m in magnitude]) * numpy.exp(
+                1j * numpy.array([numpy.interp(frequencies, f, a) for a in phase])
+            )
+
+        return dict(zip(self.names, values, strict=True))
+
+    def start(
+        self, component: pf.Component, frequencies: Sequence[float], **kwargs: object
+    ) -> pf.SMatrix:
+        technology_kwargs = component.technology.parametric_kwargs
+        parameters = {}
+        for name in self.grid:
+            if name in self.parameters:
+                parameters[name] = self.parameters[name]
+            elif name in technology_kwargs:
+                parameters[name] = technology_kwargs[name]
+            else:
+                raise RuntimeError(
+                    f"Parameter {name!r} not available in the component technology or model "
+                    f"parameters."
+                )
+        elements = self.interpolate(frequencies, parameters)
+        return pf.SMatrix(frequencies, elements, component.ports)
+
+    def save(self, filename: str | pathlib.Path) -> None:
+        """Save the model data to a file.
+
+        Args:
+            filename: Output npz file.
+        """
+        with pathlib.Path(filename).open("wb") as file:
+            file.write(self.as_bytes)
+
+    @classmethod
+    def load(cls, filename: str | pathlib.Path) -> "ProcessGridModel":
+        """Load a model saved with :meth:`save`.
+
+        Args:
+            filename: Model file.
+
+        Returns:
+            ProcessGridModel: Loaded model.
+        """
+        return cls.from_bytes(pathlib.Path(filename).read_bytes())
+
+    @property
+    def as_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        numpy.savez_compressed(
+            buffer,
+            grid_names=numpy.array(list(self.grid), dtype=str),
+            frequencies=self.frequencies,
+            names=numpy.array(self.names, dtype=str).reshape(-1, 2),
+            values=self.values,
+            parameter_names=numpy.array(list(self.parameters), dtype=str),
+            parameter_values=numpy.array(list(self.parameters.values()), dtype=float),
+            **{f"grid_{i}": v for i, v in enumerate(self.grid.values())},
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, byte_repr: bytes) -> "ProcessGridModel":
+        with numpy.load(io.BytesIO(byte_repr)) as data:
+            grid = {str(n): data[f"grid_{i}"] for i, n in enumerate(data["grid_names"])}
+            parameters = {
+                str(n): float(v)
+                for n, v in zip(data["parameter_names"], data["parameter_values"], strict=True)
+            }
+            return cls(
+                grid,
+                data["frequencies"],
+                [(str(i), str(j)) for i, j in data["names"]],
+                data["values"],
+                parameters,
+            )
+
+
+pf.register_model_class(ProcessGridModel)
+
+
+def build_grid_model(
+    cell_name: str,
+    grid: dict[str, Sequence[float]],
+    frequencies: Sequence[float],
+    technology_kwargs: dict = {},
+    max_concurrency: int = 4,
+    output: str | pathlib.Path | None = None,
+    solver: object | None = None,
+) -> ProcessGridModel:
+    """Simulate a library component over a parameter grid.
+
+    The S matrices at all grid nodes are computed with
+    :func:`simulate_library`, so results in ``output`` are reused when the
+    build is repeated or resumed.
+
+    Args:
+        cell_name: Name of the library component.
+        grid: Technology parameter names (keyword arguments of
+          :func:`ebeam`) and their grid values.
+        frequencies: Frequencies for the simulations.
+        technology_kwargs: Fixed keyword arguments for :func:`ebeam`.
+        max_concurrency: Maximal number of simultaneous simulations.
+        output: Directory where the simulation results are stored.
+        solver: Solver function passed to :func:`simulate_library`.
+
+    Returns:
+        ProcessGridModel: Model interpolated from the simulated grid.
+    """
+    grid = {k: sorted(float(x) for x in v) for k, v in grid.items()}
+    frequencies = numpy.asarray(frequencies, dtype=float)
+    points = [dict(zip(grid, p, strict=True)) for p in itertools.product(*grid.values())]
+
+    def simulate(point: dict[str, float]) -> pf.SMatrix:
+        technology = ebeam(**technology_kwargs, **point)
+        result = simulate_library(
+            technology,
+            [cell_name],
+            frequencies,
+            max_concurrency=1,
+            output=output,
+            solver=solver,
+            progress=False,
+        )
+        if cell_name not in result:
+            raise ValueError(f"Component {cell_name!r} does not have a Tidy3D model.")
+        return result[cell_name]
+
+    with ThreadPoolExecutor(max(1, max_concurrency)) as executor:
+        s_matrices = list(executor.map(simulate, points))
+
+    names = sorted(s_matrices[0].elements)
+    values = numpy.array([[s.elements[n] for n in names] for s in s_matrices])
+    values = values.reshape(*(len(v) for v in grid.values()), len(names), len(frequencies))
+    return ProcessGridModel(grid, frequencies, names, values)
@@ -0,0 +1,202 @@
+"""Batch S matrix computation for the whole component library.
+
+All modeled library cells are collected as simulation jobs for a given
+technology. Jobs with identical content (same geometry, ports, technology,
+model parameters and frequencies) are computed only once, and the remaining
+ones are run largest-first with bounded concurrency. When an output
+directory is given, each result is written to it as soon as it is
+available, so an interrupted run resumes from the jobs not yet completed.
+
+The solver can be replaced by any function with the signature
+``solver(component, frequencies) -> SMatrix``, for example a local stand-in
+for testing.
+
+Example:
+    >>> s_matrices = simulate_library(  # doctest: +SKIP
+    ...     ebeam(sin_thickness=0.41), output="corner_041", max_concurrency=8
+    ... )
+    >>> s_matrices["ebeam_YBranch_te1310"]  # doctest: +SKIP
+"""
+
+import os
+import pathlib
+import re
+import tempfile
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy
+import photonforge as pf
+
+from ._component_data import _component_data
+from .component import components
+from .s_matrix_cache import _read_s_matrix, _write_s_matrix, key, s_matrix
+
+# Default wavelength bands (in μm) for each design wavelength (in nm)
+_bands = {1550: (1.5, 1.6), 1310: (1.26, 1.36), 895: (0.87, 0.92)}
+
+
+def _default_solver(component: pf.Component, frequencies: numpy.ndarray) -> pf.SMatrix:
+    return s_matrix(component, frequencies, show_progress=False)
+
+
+def design_frequencies(cell_name: str, points: int = 101) -> numpy.ndarray:
+    """Default frequency grid for a library component.
+
+    The band is selected by the design wavelength found in the component
+    name or, if not present there, in the names of its port specifications.
+
+    Args:
+        cell_name: Name of the library component.
+        points: Number of frequency points.
+
+    Returns:
+        numpy.ndarray: Frequency grid.
+    """
+    _, port_data, _, _ = _component_data[cell_name]
+    sources = [cell_name]
+    sources.extend(data[2] for data in port_data if len(data) == 3 and isinstance(data[1], int))
+    for source in sources:
+        for number in re.findall(r"\d+", source):
+            band = _bands.get(int(number))
+            if band is not None:
+                return pf.C_0 / numpy.linspace(*band, points)
+    raise ValueError(
+        f"Design wavelength of {cell_name!r} not found. Frequencies must be set explicitly."
+    )
+
+
+def estimated_cost(component: pf.Component) -> float:
+    """Relative cost estimate for the S matrix computation of a component.
+
+    The estimate is the in-plane area of the simulation domain times the
+    number of port sources that must be simulated (ports exchanged by a
+    symmetry are not counted).
+
+    Args:
+        component: Component with a Tidy3D model as active model.
+
+    Returns:
+        float: Relative cost.
+    """
+    (x_min, y_min), (x_max, y_max) = component.bounds()
+    bounds = getattr(component.active_model, "bounds", None)
+    if bounds is not None:
+        lower, upper = bounds
+        x_min = x_min if lower[0] is None else max(x_min, lower[0])
+        y_min = y_min if lower[1] is None else max(y_min, lower[1])
+        x_max = x_max if upper[0] is None else min(x_max, upper[0])
+        y_max = y_max if upper[1] is None else min(y_max, upper[1])
+    symmetries = getattr(component.active_model, "port_symmetries", None) or ()
+    sources = len(component.ports) - len({s[1] for s in symmetries})
+    return max(x_max - x_min, 0) * max(y_max - y_min, 0) * max(sources, 1)
+
+
+def _save(filename: pathlib.Path, s_matrix: pf.SMatrix) -> None:
+    fd, tmp_name = tempfile.mkstemp(dir=filename.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            _write_s_matrix(tmp, s_matrix)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        pathlib.Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def simulate_library(
+    technology: pf.Technology | None = None,
+    names: list[str] | None = None,
+    frequencies: numpy.ndarray | None = None,
+    max_concurrency: int = 4,
+    output: str | pathlib.Path | None = None,
+    solver: Callable[[pf.Component, numpy.ndarray], pf.SMatrix] | None = None,
+    tidy3d_model_kwargs: dict = {},
+    progress: bool = True,
+) -> dict[str, pf.SMatrix]:
+    """Compute the S matrices of library components in a single batch.
+
+    Args:
+        technology: Technology for the library components. If ``None``,
+          the default :func:`ebeam` technology is used.
+        names: Names of the components to simulate. If ``None``, all names
+          in ``component_names`` are used. Components without a Tidy3D
+          model are skipped.
+        frequencies: Frequency grid. If ``None``, the band of the design
+          wavelength of each component is used (see
+          :func:`design_frequencies`).
+        max_concurrency: Maximal number of simultaneous simulations.
+        output: Directory where results are stored. Jobs with results
+          already present in this directory are not run again.
+        solver: Function used to compute each S matrix. It receives the
+          component and the frequencies. If ``None``, the component's
+          active model is used through the persistent S matrix cache.
+        tidy3d_model_kwargs: Keyword arguments passed to the Tidy3D models
+          of the library components.
+        progress: If set, print progress information.
+
+    Returns:
+        dict[str, SMatrix]: S matrices indexed by component name.
+    """
+    if technology is None:
+        from .technology import ebeam  # noqa: PLC0415
+
+        technology = ebeam()
+    if solver is None:
+        solver = _default_solver
+    if output is not None:
+        output = pathlib.Path(output)
+        output.mkdir(parents=True, exist_ok=True)
+
+    library = {
+        name: c
+        for name, c in components(
+            names, technology, tidy3d_model_kwargs, shared=True, use_bundle=False
+        ).items()
+        if isinstance(c.active_model, pf.Tidy3DModel)
+    }
+
+    # Identical jobs share the same key and are computed only once
+    jobs = {}
+    job_frequencies = {}
+    for name, c in library.items():
+        cell_frequencies = design_frequencies(name) if frequencies is None else frequencies
+        k = key(c, c.active_model, cell_frequencies)
+        jobs.setdefault(k, []).append(name)
+        job_frequencies[k] = cell_frequencies
+
+    results = {}
+    pending = []
+    for k, job_names in jobs.items():
+        c = library[job_names[0]]
+        filename = None if output is None else output / f"{k}.npz"
+        if filename is not None and filename.is_file():
+            results[k] = _read_s_matrix(filename, c.ports)
+        else:
+            pending.append((estimated_cost(c), k, filename))
+    pending.sort(key=lambda job: -job[0])
+
+    total = len(jobs)
+
+    def run(k: str, filename: pathlib.Path | None) -> pf.SMatrix:
+        s_matrix = solver(library[jobs[k][0]], job_frequencies[k])
+        if filename is not None:
+            _save(filename, s_matrix)
+        return s_matrix
+
+    if progress and len(results) > 0:
+        print(f"Loaded {len(results)}/{total} results from {output}", flush=True)
+
+    with ThreadPoolExecutor(max(1, max_concurrency)) as executor:
+        futures = {executor.submit(run, k, filename): k for _, k, filename in pending}
+        try:
+            for future in as_completed(futures):
+                k = futures[future]
+                results[k] = future.result()
+                if progress:
+                    print(f"[{len(results)}/{total}] {', '.join(jobs[k])}", flush=True)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return {name: results[k] for k, job_names in jobs.items() for name in job_names}
@@ -0,0 +1,193 @@
+"""Monte Carlo studies over the technology random variables.
+
+Samples of the random variables declared in :func:`ebeam` are drawn from a
+seeded generator, and the technology variants and library components for
+each sample are built in a process pool. Each sample is evaluated by a
+user-provided function and its result is written to a JSON Lines file as
+soon as it is available, so large studies do not keep all results in
+memory.
+
+Example:
+    >>> def max_width(components, parameters):
+    ...     return max(c.size()[1] for c in components.values())
+    >>> summary = run(  # doctest: +SKIP
+    ...     max_width, ["ebeam_YBranch_te1310"], 1000, "results.jsonl", seed=0
+    ... )
+    >>> for record in load_results("results.jsonl"):  # doctest: +SKIP
+    ...     print(record["sample"], record["parameters"], record["result"])
+"""
+
+import collections
+import functools
+import itertools
+import json
+import os
+import pathlib
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import numpy
+import photonforge as pf
+
+from .component import components
+from .technology import ebeam
+
+MonteCarloSummary = collections.namedtuple(
+    "MonteCarloSummary", ("samples", "evaluations", "output")
+)
+
+
+def draw_samples(
+    samples: int,
+    seed: int | None = None,
+    technology_kwargs: dict = {},
+    decimals: int = 6,
+) -> list[dict[str, float]]:
+    """Draw samples of the technology random variables.
+
+    Args:
+        samples: Number of samples.
+        seed: Seed for the random number generator.
+        technology_kwargs: Keyword arguments for :func:`ebeam` used to
+          obtain the random variable declarations.
+        decimals: Number of decimal places the sampled values are rounded
+          to.
+
+    Returns:
+        list[dict[str, float]]: Technology parameters for each sample.
+    """
+    variables = [
+        pf.monte_carlo.RandomVariable(v.name, **v.value_spec)
+        for v in ebeam(**technology_kwargs).random_variables
+    ]
+    rng = numpy.random.default_rng(seed)
+    cdf = rng.random((samples, len(variables)))
+    return [
+        {
+            v.name: round(float(v.set_by_cdf(x)), decimals)
+            for v, x in zip(variables, row, strict=True)
+        }
+        for row in cdf
+    ]
+
+
+def _evaluate(
+    function: Callable[[dict[str, pf.Component], dict[str, float]], object],
+    names: list[str],
+    technology_kwargs: dict,
+    parameters: dict[str, float],
+) -> object:
+    technology = ebeam(**technology_kwargs, **parameters)
+    return function(components(names, technology, max_workers=1), parameters)
+
+
+def _bounded_map(
+    executor: Executor, function: Callable, items: Iterable, max_in_flight: int
+) -> Iterator:
+    # Like executor.map, but with at most max_in_flight submitted tasks not yet consumed
+    items = iter(items)
+    pending = collections.deque(
+        executor.submit(function, x) for x in itertools.islice(items, max_in_flight)
+    )
+    while pending:
+        result = pending.popleft().result()
+        pending.extend(executor.submit(function, x) for x in itertools.islice(items, 1))
+        yield result
+
+
+def _json_default(obj: object) -> object:
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def run(
+    function: Callable[[dict[str, pf.Component], dict[str, float]], object],
+    names: list[str],
+    samples: int,
+    output: str | pathlib.Path,
+    seed: int | None = None,
+    technology_kwargs: dict = {},
+    decimals: int = 6,
+    max_workers: int | None = None,
+) -> MonteCarloSummary:
+    """Run a Monte Carlo study over the technology random variables.
+
+    Samples whose parameters round to the same values are evaluated only
+    once. Results are written in sample order to ``output`` as JSON Lines,
+    with one record per sample containing the keys ``"sample"``,
+    ``"parameters"`` and ``"result"``.
+
+    Args:
+        function: Function evaluated for each sample. It receives a
+          dictionary with the requested components, built with the sampled
+          technology, and the dictionary of sampled parameters. It must be
+          picklable (defined at module level) and return a JSON-serializable
+          result.
+        names: Names of the library components to build for each sample.
+        samples: Number of samples.
+        output: Output file.
+        seed: Seed for the random number generator.
+        technology_kwargs: Fixed keyword arguments for :func:`ebeam`.
+        decimals: Number of decimal places the sampled values are rounded
+          to.
+        max_workers: Number of worker processes. If ``None``, the number of
+          CPUs is used. If 0, samples are evaluated in the current process.
+          At most twice this number of samples are submitted ahead of the
+          results written to the output.
+
+    Returns:
+        MonteCarloSummary: Named tuple with the number of ``samples``, the
+        number of distinct ``evaluations`` and the ``output`` path.
+    """
+    names = list(dict.fromkeys(names))
+    parameters = draw_samples(samples, seed, technology_kwargs, decimals)
+    keys = [tuple(sorted(p.items())) for p in parameters]
+
+    # Results are kept only while a later sample still needs them
+    remaining = collections.Counter(keys)
+    unique = list(dict.fromkeys(keys))
+    evaluate = functools.partial(_evaluate, function, names, technology_kwargs)
+
+    output = pathlib.Path(output)
+    with output.open("w") as out:
+        if max_workers == 0:
+            results = (evaluate(dict(k)) for k in unique)
+            executor = None
+        else:
+            if max_workers is None:
+                max_workers = os.cpu_count() or 1
+            executor = ProcessPoolExecutor(max_workers)
+            results = _bounded_map(executor, evaluate, (dict(k) for k in unique), 2 * max_workers)
+
+        try:
+            done = {}
+            for i, (key, p) in enumerate(zip(keys, parameters, strict=True)):
+                if key not in done:
+                    done[key] = next(results)
+                result = done[key]
+                remaining[key] -= 1
+                if remaining[key] == 0:
+                    del done[key]
+                record = {"sample": i, "parameters": p, "result": result}
+                out.write(json.dumps(record, default=_json_default) + "\n")
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    return MonteCarloSummary(samples, len(unique), output)
+
+
+def load_results(filename: str | pathlib.Path) -> Iterator[dict]:
+    """Iterate over the records written by :func:`run`.
+
+    Args:
+        filename: Results file.
+
+    Yields:
+        dict: Record with keys ``"sample"``, ``"parameters"`` and
+        ``"result"``.
+    """
+    with pathlib.Path(filename).open() as results:
+        for line in results:
+            yield json.loads(line)
@@ -0,0 +1,192 @@
+"""Vectorized waveguide routing with the port spec path profiles.
+
+Many routes are built at once from arrays of waypoints. Corners are
+rounded with circular bends and every profile in ``PortSpec.path_profiles``
+is offset from the route centerlines in a single NumPy pass for all routes
+with the same number of waypoints. Bends are discretized with the same
+number of points for all corners in a batch.
+
+Example:
+    >>> waypoints = numpy.zeros((1000, 3, 2))
+    >>> waypoints[:, 1, 0] = 20
+    >>> waypoints[:, 2] = (20, 20)
+    >>> waypoints[:, :, 1] += 5 * numpy.arange(1000)[:, None]
+    >>> c = pf.Component("routes", technology)  # doctest: +SKIP
+    >>> add_routes(c, waypoints, "SiN_TE_1550_750", radius=20)  # doctest: +SKIP
+"""
+
+from collections.abc import Sequence
+
+import numpy
+import photonforge as pf
+
+from .technology import ebeam
+
+
+def _normalize(vectors: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+    length = numpy.linalg.norm(vectors, axis=-1)
+    safe = numpy.where(length > 0, length, 1)
+    return vectors / safe[..., None], length
+
+
+def _fillet(points: numpy.ndarray, radius: float, tolerance: float) -> numpy.ndarray:
+    # Replace the inner vertices of all routes (shape: routes × points × 2) with circular arcs
+    if radius <= 0 or points.shape[1] < 3:
+        return points
+
+    u, length = _normalize(numpy.diff(points, axis=1))
+    u1 = u[:, :-1]
+    u2 = u[:, 1:]
+    cross = u1[..., 0] * u2[..., 1] - u1[..., 1] * u2[..., 0]
+    dot = (u1 * u2).sum(axis=-1)
+    theta = numpy.arctan2(cross, dot)
+    tangent = radius * numpy.tan(numpy.abs(theta) / 2)
+
+    used = numpy.zeros(length.shape)
+    used[:, :-1] += tangent
+    used[:, 1:] += tangent
+    if numpy.any(used > length * (1 + 1e-9)):
+        raise ValueError("Bend radius too large for the distance between route waypoints.")
+
+    # Same number of arc points for every corner in the batch
+    max_theta = numpy.abs(theta).max()
+    step = 2 * numpy.arccos(max(1 - tolerance / radius, -1))
+    n = max(2, int(numpy.ceil(max_theta / step)) + 1) if step > 0 else 2
+
+    corner = points[:, 1:-1]
+    start = corner - u1 * tangent[..., None]
+    normal = numpy.stack((-u1[..., 1], u1[..., 0]), axis=-1)
+    center = start + (numpy.sign(theta) * radius)[..., None] * normal
+    phi0 = numpy.arctan2(start[..., 1] - center[..., 1], start[..., 0] - center[..., 0])
+    phi = phi0[..., None] + theta[..., None] * numpy.linspace(0, 1, n)
+    arcs = center[..., None, :] + radius * numpy.stack((numpy.cos(phi), numpy.sin(phi)), axis=-1)
+    straight = theta == 0
+    arcs[straight] = corner[straight][:, None]
+
+    routes = points.shape[0]
+    return numpy.concatenate((points[:, :1], arcs.reshape(routes, -1, 2), points[:, -1:]), axis=1)
+
+
+def _offset_normals(centerline: numpy.ndarray) -> numpy.ndarray:
+    # Miter normals at every vertex of all centerlines (shape: routes × points × 2)
+    u, length = _normalize(numpy.diff(centerline, axis=1))
+
+    # Zero-length segments (from straight corners) take the direction of the previous segment
+    valid = length > 0
+    index = numpy.where(valid, numpy.arange(length.shape[1]), 0)
+    index = numpy.maximum.accumulate(index, axis=1)
+    u = numpy.take_along_axis(u, index[..., None], axis=1)
+
+    n = numpy.stack((-u[..., 1], u[..., 0]), axis=-1)
+    n_in = numpy.concatenate((n[:, :1], n), axis=1)
+    n_out = numpy.concatenate((n, n[:, -1:]), axis=1)
+    scale = 1 + (n_in * n_out).sum(axis=-1)
+    return (n_in + n_out) / numpy.maximum(scale, 1e-6)[..., None]
+
+
+def _deduplicate(vertices: numpy.ndarray) -> numpy.ndarray:
+    keep = numpy.ones(len(vertices), dtype=bool)
+    keep[1:] = numpy.any(numpy.abs(numpy.diff(vertices, axis=0)) > 1e-9, axis=1)
+    return vertices[keep]
+
+
+def route_polygons(
+    waypoints: numpy.ndarray | Sequence[numpy.ndarray],
+    port_spec: str | pf.PortSpec,
+    technology: pf.Technology | None = None,
+    radius: float = 0.0,
+    tolerance: float = 0.001,
+) -> dict[tuple[int, int], list[pf.Polygon]]:
+    """Create the profile polygons for many waveguide routes at once.
+
+    Args:
+        waypoints: Route waypoints, either as an array with shape
+          ``(routes, points, 2)`` or as a sequence of ``(points, 2)``
+          arrays with any number of points.
+        port_spec: Port specification, or its name in the technology, with
+          the ``path_profiles`` for the routes.
+        technology: Technology with the port specification. If ``None``,
+          the default :func:`ebeam` technology is used.
+        radius: Bend radius used to round the route corners. If 0, the
+          corners are mitered. Otherwise, it must not be smaller than the
+          extent of any path profile from the centerline.
+        tolerance: Maximal deviation of the discretized bends from the
+          circular arcs.
+
+    Returns:
+        dict[tuple[int, int], list[Polygon]]: Polygons for all routes,
+        indexed by layer, in route order.
+    """
+    if isinstance(port_spec, str):
+        if technology is None:
+            technology = ebeam()
+        if port_spec not in technology.ports:
+            raise ValueError(f"Port specification {port_spec!r} not found in the technology.")
+        port_spec = technology.ports[port_spec]
+    profiles = port_spec.path_profiles
+    if len(profiles) == 0:
+        raise ValueError("Port specification does not have any path profiles.")
+    if radius > 0 and max(abs(offset) + width / 2 for width, offset, _ in profiles) > radius:
+        raise ValueError(
+            "Bend radius must be larger than the extent of all path profiles from the route "
+            "centerline."
+        )
+
+    if isinstance(waypoints, numpy.ndarray) and waypoints.ndim == 3:
+        routes = list(waypoints)
+    else:
+        routes = [numpy.asarray(w, dtype=float) for w in waypoints]
+    if any(r.ndim != 2 or r.shape[0] < 2 or r.shape[1] != 2 for r in routes):
+        raise ValueError("Each route must have at least 2 waypoints with 2 coordinates.")
+
+    # Routes with the same number of waypoints are processed together
+    groups = {}
+    for i, r in enumerate(routes):
+        groups.setdefault(len(r), []).append(i)
+
+    polygons = [None] * len(routes)
+    for indices in groups.values():
+        points = numpy.array([routes[i] for i in indices], dtype=float)
+        centerline = _fillet(points, radius, tolerance)
+        normals = _offset_normals(centerline)
+        result = [[] for _ in indices]
+        for width, offset, layer in profiles:
+            left = centerline + (offset + width / 2) * normals
+            right = centerline + (offset - width / 2) * normals
+            outlines = numpy.concatenate((left, right[:, ::-1]), axis=1)
+            for k, outline in enumerate(outlines):
+                result[k].append((layer, pf.Polygon(_deduplicate(outline))))
+        for i, r in zip(indices, result, strict=True):
+            polygons[i] = r
+
+    by_layer = {}
+    for route in polygons:
+        for layer, polygon in route:
+            by_layer.setdefault(layer, []).append(polygon)
+    return by_layer
+
+
+def add_routes(
+    component: pf.Component,
+    waypoints: numpy.ndarray | Sequence[numpy.ndarray],
+    port_spec: str | pf.PortSpec,
+    radius: float = 0.0,
+    tolerance: float = 0.001,
+) -> pf.Component:
+    """Add many waveguide routes to a component.
+
+    Args:
+        component: Component that receives the route polygons. Its
+          technology is used to look up the port specification.
+        waypoints: Route waypoints (see :func:`route_polygons`).
+        port_spec: Port specification or its name in the technology.
+        radius: Bend radius used to round the route corners.
+        tolerance: Maximal deviation of the discretized bends.
+
+    Returns:
+        Component: The modified component.
+    """
+    layers = route_polygons(waypoints, port_spec, component.technology, radius, tolerance)
+    for layer, polygons in layers.items():
+        component.add(layer, *polygons)
+    return component
@@ -0,0 +1,361 @@
+"""Persistent S matrix cache for the library Tidy3D models.
+
+S matrices computed by the library models or through :func:`s_matrix` are
+stored on disk, so that they survive the Python session and can be shared
+between users through a common directory. Entries are content-addressed by
+the component geometry and ports, the technology, the model parameters and
+the frequency grid, so any change in those invalidates the cached result.
+Model arguments that do not change the results (like ``verbose``) are not
+part of the address.
+
+Library components use :class:`SiEPICSiNTidy3DModel`, which reads and writes
+the cache, so it is also used by :meth:`photonforge.Component.s_matrix`. The
+model class is registered when photonforge is imported after the package (or
+on package import, if photonforge is already loaded), so that phf files with
+library components can be loaded.
+
+The cache can be configured through the module attributes:
+
+- ``enabled``: set to ``False`` to disable the cache.
+- ``path``: cache directory. Defaults to the value of the environment
+  variable ``SIEPIC_SIN_FORGE_S_MATRIX_CACHE`` or
+  ``~/.cache/siepic_sin_forge/s_matrix``.
+- ``max_size``: maximal cache size in bytes. The least recently used
+  entries are removed when it is exceeded.
+
+It can also be managed from the command line::
+
+    python -m siepic_sin_forge.s_matrix_cache info
+    python -m siepic_sin_forge.s_matrix_cache warm ebeam_YBranch_te1310 ebeam_MMI_2x2_5050_te1310
+    python -m siepic_sin_forge.s_matrix_cache prune --max-size 100000000
+"""
+
+import argparse
+import collections
+import hashlib
+import os
+import pathlib
+import tempfile
+
+import numpy
+import photonforge as pf
+
+enabled = True
+path = pathlib.Path(
+    os.environ.get(
+        "SIEPIC_SIN_FORGE_S_MATRIX_CACHE",
+        pathlib.Path.home() / ".cache" / "siepic_sin_forge" / "s_matrix",
+    )
+)
+max_size = 2**30
+
+CacheStats = collections.namedtuple("CacheStats", ("path", "entries", "size", "max_size"))
+
+# Model arguments that do not affect the computed S matrix
+_non_physical_kwargs = {"verbose"}
+
+
+def _hash_component(digest: object, component: pf.Component) -> None:
+    # The top-level name is left out, so that identical cells share the same key
+    digest.update(repr((component.structures, component.references)).encode())
+    for c in sorted(component.dependencies(), key=lambda d: d.name):
+        digest.update(repr((c.name, c.structures, c.references)).encode())
+    digest.update(repr((component.ports, component.terminals)).encode())
+
+
+def _hash_technology(digest: object, technology: pf.Technology) -> None:
+    digest.update(
+        repr(
+            (
+                technology.name,
+                technology.version,
+                sorted(technology.parametric_kwargs.items()),
+                technology.extrusion_specs,
+                technology.ports,
+            )
+        ).encode()
+    )
+
+
+def _hash_model(digest: object, model: pf.Model) -> None:
+    kwargs = sorted(
+        (k, v) for k, v in model.parametric_kwargs.items() if k not in _non_physical_kwargs
+    )
+    digest.update(repr((type(model).__name__, kwargs)).encode())
+
+
+def key(component: pf.Component, model: pf.Model, frequencies: numpy.ndarray) -> str:
+    """Content hash used to address a cached S matrix.
+
+    The component name is not part of the hash, so identical components
+    with different names share the same entry.
+
+    Args:
+        component: Component for which the S matrix is computed.
+        model: Model used in the computation.
+        frequencies: Frequency grid.
+
+    Returns:
+        str: Hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    _hash_component(digest, component)
+    _hash_technology(digest, component.technology)
+    _hash_model(digest, model)
+    digest.update(numpy.asarray(frequencies, dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def _file(key: str) -> pathlib.Path:
+    return pathlib.Path(path) / key[:2] / f"{key}.npz"
+
+
+def _read_s_matrix(filename: pathlib.Path, ports: dict[str, pf.Port]) -> pf.SMatrix:
+    with numpy.load(filename) as data:
+        frequencies = data["frequencies"]
+        names = data["names"]
+        values = data["values"]
+    elements = {(str(i), str(j)): v for (i, j), v in zip(names, values, strict=True)}
+    return pf.SMatrix(frequencies, elements, ports)
+
+
+def _write_s_matrix(file: object, s_matrix: pf.SMatrix) -> None:
+    elements = s_matrix.elements
+    names = numpy.array(list(elements.keys()), dtype=str).reshape(-1, 2)
+    values = numpy.array([elements[k] for k in elements], dtype=complex)
+    numpy.savez_compressed(file, frequencies=s_matrix.frequencies, names=names, values=values)
+
+
+def load(key: str, component: pf.Component | None = None) -> pf.SMatrix | None:
+    """Load an S matrix from the cache.
+
+    Args:
+        key: Cache key from :func:`key`.
+        component: If set, the component ports are included in the S matrix.
+
+    Returns:
+        SMatrix: Cached S matrix or ``None`` if not found.
+    """
+    filename = _file(key)
+    try:
+        s_matrix = _read_s_matrix(filename, {} if component is None else component.ports)
+    except (OSError, KeyError, ValueError):
+        return None
+
+    # Mark the entry as recently used
+    try:
+        os.utime(filename)
+    except OSError:
+        pass
+
+    return s_matrix
+
+
+def store(key: str, s_matrix: pf.SMatrix) -> None:
+    """Store an S matrix in the cache.
+
+    The cache is pruned to :data:`max_size` after the new entry is written.
+
+    Args:
+        key: Cache key from :func:`key`.
+        s_matrix: S matrix to be stored.
+    """
+    filename = _file(key)
+    filename.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temporary file first, so that concurrent readers never see partial entries
+    fd, tmp_name = tempfile.mkstemp(dir=filename.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            _write_s_matrix(tmp, s_matrix)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        pathlib.Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    prune()
+
+
+def _entries() -> list[tuple[float, int, pathlib.Path]]:
+    result = []
+    for p in pathlib.Path(path).glob("*/*.npz"):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        result.append((st.st_mtime, st.st_size, p))
+    return result
+
+
+def prune(size: int | None = None) -> int:
+    """Remove least recently used entries until the cache fits a size limit.
+
+    Args:
+        size: Size limit in bytes. If ``None``, :data:`max_size` is used.
+
+    Returns:
+        int: Number of removed entries.
+    """
+    if size is None:
+        size = max_size
+    entries = sorted(_entries())
+    total = sum(e[1] for e in entries)
+    removed = 0
+    for _, entry_size, p in entries:
+        if total <= size:
+            break
+        p.unlink(missing_ok=True)
+        total -= entry_size
+        removed += 1
+    return removed
+
+
+def clear() -> int:
+    """Remove all cached entries.
+
+    Returns:
+        int: Number of removed entries.
+    """
+    return prune(0)
+
+
+def info() -> CacheStats:
+    """Report the cache usage.
+
+    Returns:
+        CacheStats: Named tuple with the cache ``path``, number of
+        ``entries``, total ``size`` and ``max_size`` (in bytes).
+    """
+    entries = _entries()
+    return CacheStats(pathlib.Path(path), len(entries), sum(e[1] for e in entries), max_size)
+
+
+class _StoringRunner:
+    def __init__(self, runner: object, key: str) -> None:
+        self.runner = runner
+        self.key = key
+        self.stored = False
+
+    @property
+    def status(self) -> dict[str, object]:
+        return self.runner.status
+
+    @property
+    def s_matrix(self) -> pf.SMatrix:
+        s_matrix = self.runner.s_matrix
+        if not self.stored and s_matrix is not None:
+            self.stored = True
+            store(self.key, s_matrix)
+        return s_matrix
+
+
+class SiEPICSiNTidy3DModel(pf.Tidy3DModel):
+    """Tidy3D model with a persistent S matrix cache.
+
+    Accepts the same arguments as :class:`photonforge.Tidy3DModel`. Complete
+    S matrices are read from and written to the persistent cache. Partial
+    computations (with ``inputs``) and cost estimations bypass the cache.
+    """
+
+    def start(
+        self,
+        component: pf.Component,
+        frequencies: numpy.ndarray,
+        *,
+        inputs: tuple[str, ...] = (),
+        cost_estimation: bool = False,
+        **kwargs: object,
+    ) -> object:
+        if not enabled or len(inputs) > 0 or cost_estimation:
+            return super().start(
+                component, frequencies, inputs=inputs, cost_estimation=cost_estimation, **kwargs
+            )
+
+        k = key(component, self, frequencies)
+        s_matrix = load(k, component)
+        if s_matrix is not None:
+            return s_matrix
+
+        return _StoringRunner(super().start(component, frequencies, **kwargs), k)
+
+
+pf.register_model_class(SiEPICSiNTidy3DModel)
+
+
+def s_matrix(
+    component: pf.Component, frequencies: numpy.ndarray, show_progress: bool = True
+) -> pf.SMatrix:
+    """Compute the S matrix of a component through the persistent cache.
+
+    The S matrix is computed with the component's active model only if it
+    is not found in the cache, and stored afterwards.
+
+    Args:
+        component: Component to compute.
+        frequencies: Frequency grid.
+        show_progress: If set, show the computation progress.
+
+    Returns:
+        SMatrix: Computed or cached S matrix.
+    """
+    # Library models use the cache directly
+    if not enabled or isinstance(component.active_model, SiEPICSiNTidy3DModel):
+        return component.s_matrix(frequencies, show_progress=show_progress)
+
+    k = key(component, component.active_model, frequencies)
+    result = load(k, component)
+    if result is None:
+        result = component.s_matrix(frequencies, show_progress=show_progress)
+        store(k, result)
+    return result
+
+
+def _warm(names: list[str], frequencies: numpy.ndarray | None, points: int) -> None:
+    from .component import components  # noqa: PLC0415
+    from .library_simulation import design_frequencies  # noqa: PLC0415
+    from .technology import ebeam  # noqa: PLC0415
+
+    technology = ebeam()
+    for name, c in components(names or None, technology).items():
+        if not isinstance(c.active_model, pf.Tidy3DModel):
+            continue
+        cell_frequencies = design_frequencies(name, points) if frequencies is None else frequencies
+        k = key(c, c.active_model, cell_frequencies)
+        if _file(k).is_file():
+            print(f"{name}: cached")
+            continue
+        print(f"{name}: computing…")
+        s_matrix(c, cell_frequencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog=f"python -m {__spec__.name}", description="Manage the persistent S matrix cache."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("info", help="Show cache usage")
+    prune_parser = subparsers.add_parser("prune", help="Remove least recently used entries")
+    prune_parser.add_argument("--max-size", type=int, help="Size limit in bytes")
+    subparsers.add_parser("clear", help="Remove all entries")
+    warm_parser = subparsers.add_parser("warm", help="Compute and cache library S matrices")
+    warm_parser.add_argument("names", nargs="*", help="Components to compute (default: all)")
+    warm_parser.add_argument(
+        "--wavelengths", nargs=2, type=float, help="Wavelength range (default: design band)"
+    )
+    warm_parser.add_argument("--points", type=int, default=101)
+    args = parser.parse_args()
+
+    if args.command == "info":
+        stats = info()
+        print(f"Path: {stats.path}")
+        print(f"Entries: {stats.entries}")
+        print(f"Size: {stats.size} B (limit: {stats.max_size} B)")
+    elif args.command == "prune":
+        print(f"Removed {prune(args.max_size)} entries")
+    elif args.command == "clear":
+        print(f"Removed {clear()} entries")
+    else:
+        frequencies = None
+        if args.wavelengths is not None:
+            frequencies = pf.C_0 / numpy.linspace(*args.wavelengths, args.points)
+        _warm(args.names, frequencies, args.points)
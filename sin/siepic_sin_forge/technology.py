@@ -1,8 +1,18 @@
+import collections
+import functools
+import inspect
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+
 import photonforge as pf
 import photonforge.typing as pft
 import tidy3d as td
+from tidy3d.plugins.mode import ModeSolver
 
 from ._layers import _layers
+from ._media_cache import lossy_metal_medium
+from .instrumentation import stage
 
 # References:
 # https://www.appliednt.com/nanosoi-fabrication-service/
@@ -22,7 +32,7 @@ _sin = {
 }
 _router = {
     "optical": td.material_library["Au"]["Olmon2012evaporated"],
-    "electrical": td.LossyMetalMedium(
+    "electrical": lossy_metal_medium(
         conductivity=17,
         frequency_range=[0.1e9, 200e9],
         fit_param=td.SurfaceImpedanceFitterParam(max_num_poles=16),
@@ -30,7 +40,7 @@ _router = {
 }
 _heater = {
     "optical": td.material_library["W"]["Werner2009"],
-    "electrical": td.LossyMetalMedium(
+    "electrical": lossy_metal_medium(
         conductivity=1.6,
         frequency_range=[0.1e9, 200e9],
         fit_param=td.SurfaceImpedanceFitterParam(max_num_poles=16),
@@ -39,49 +49,101 @@ _heater = {
 _open = td.Medium(permittivity=1.0)
 
 
-@pf.parametric_technology
-def ebeam(
-    *,
-    sin_thickness: pft.PositiveDimension = 0.400,
-    sin_mask_dilation: pft.Coordinate = 0.0,
-    sidewall_angle: pft.Angle = 0.0,
-    heater_thickness: pft.PositiveDimension = 0.2,
-    router_thickness: pft.PositiveDimension = 0.6,
-    bottom_oxide_thickness: pft.PositiveDimension = 4.5,
-    top_oxide_thickness: pft.PositiveDimension = 3.0,
-    passivation_oxide_thickness: pft.PositiveDimension = 0.3,
-    sio2: dict[str, pft.Medium] = _sio2,
-    si: dict[str, pft.Medium] = _si,
-    sin: dict[str, pft.Medium] = _sin,
-    router_metal: dict[str, pft.Medium] = _router,
-    heater_metal: dict[str, pft.Medium] = _heater,
-    opening: pft.Medium = _open,
-) -> pf.Technology:
-    """Create a technology for the e-beam SiN PDK.
+CacheInfo = collections.namedtuple("CacheInfo", ("hits", "misses", "maxsize", "currsize"))
 
-    Args:
-        sin_thickness: SiN layer thickness.
-        sin_mask_dilation: Mask dilation for the SiN layer.
-        sidewall_angle: Sidewall angle (in degrees) for SiN etching.
-        heater_thickness: Thickness of the heater metal layer.
-        router_thickness: Thickness of the routing metal bilayer.
-        bottom_oxide_thickness: Thickness of the bottom oxide clad.
-        top_oxide_thickness: Thickness of the top oxide clad, measured from
-          the substrate.
-        passivation_oxide_thickness: Thickness of oxide above metal layers.
-        sio2: Background medium.
-        si: Silicon medium.
-        sin: Silicon nitride medium.
-        router_metal: Routing metal medium.
-        heater_metal: Heater metal medium.
-        opening: Medium for openings.
 
-    Returns:
-        Technology: E-Beam PDK technology definition.
-    """
+def _copy_technology(technology: pf.Technology) -> pf.Technology:
+    # Technology.copy(deep=True) also deep-copies the media in the parametric arguments, which is
+    # slower than creating the technology again. Only the mutable specifications are copied here.
+    result = technology.copy()
+    result.layers = {k: v.copy() for k, v in technology.layers.items()}
+    result.extrusion_specs = [e.copy(True) for e in technology.extrusion_specs]
+    result.ports = {k: v.copy() for k, v in technology.ports.items()}
+    result.parametric_kwargs = dict(technology.parametric_kwargs)
+    result.random_variables = list(technology.random_variables)
+    return result
+
+
+def _memoize(technology_func, maxsize=128):
+    # Memoization layer in front of the parametric technology function. Keys only use the ids of
+    # non-numeric arguments (kept alive in the cache entries), so that a cache hit does not require
+    # hashing or comparing media. Callers get copies of the cached technologies, and the
+    # photonforge parametric cache (unbounded, with no way to clear it) is never used, so this
+    # cache is the only one holding technologies.
+    cache = collections.OrderedDict()
+    lock = threading.Lock()
+    stats = [0, 0]
 
-    layers = {k: v.copy() for k, v in _layers.items()}
+    defaults = inspect.unwrap(technology_func).__kwdefaults__ or {}
+    stage_name = technology_func.__name__
 
+    def _key(kwargs):
+        key = []
+        for name, value in sorted((defaults | kwargs).items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = float(value)
+            elif isinstance(value, dict):
+                value = tuple((k, id(v)) for k, v in value.items())
+            elif not isinstance(value, (bool, str, type(None))):
+                value = id(value)
+            key.append((name, value))
+        return tuple(key)
+
+    @functools.wraps(technology_func)
+    def _memoized(*args, **kwargs):
+        with stage(stage_name):
+            if len(args) > 0 or not kwargs.pop("use_parametric_cache", True):
+                return technology_func(*args, use_parametric_cache=False, **kwargs)
+
+            key = _key(kwargs)
+            with lock:
+                entry = cache.get(key)
+                if entry is not None:
+                    cache.move_to_end(key)
+                    stats[0] += 1
+                    return _copy_technology(entry[1])
+                stats[1] += 1
+
+            technology = technology_func(use_parametric_cache=False, **kwargs)
+
+            with lock:
+                cache[key] = (kwargs, technology)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return _copy_technology(technology)
+
+    def cache_info():
+        with lock:
+            return CacheInfo(stats[0], stats[1], maxsize, len(cache))
+
+    def cache_clear():
+        with lock:
+            cache.clear()
+            stats[:] = [0, 0]
+
+    _memoized.cache_info = cache_info
+    _memoized.cache_clear = cache_clear
+    return _memoized
+
+
+def _extrusion_specs(
+    *,
+    sin_thickness: pft.PositiveDimension,
+    sin_mask_dilation: pft.Coordinate,
+    sidewall_angle: pft.Angle,
+    heater_thickness: pft.PositiveDimension,
+    router_thickness: pft.PositiveDimension,
+    bottom_oxide_thickness: pft.PositiveDimension,
+    top_oxide_thickness: pft.PositiveDimension,
+    passivation_oxide_thickness: pft.PositiveDimension,
+    sio2: dict[str, pft.Medium],
+    si: dict[str, pft.Medium],
+    sin: dict[str, pft.Medium],
+    router_metal: dict[str, pft.Medium],
+    heater_metal: dict[str, pft.Medium],
+    opening: pft.Medium,
+) -> list[pf.ExtrusionSpec]:
+    # Extrusion phase of the technology creation, timed as its own stage
     z_router = top_oxide_thickness + heater_thickness
     z_open = z_router + router_thickness
     z_top = z_open + passivation_oxide_thickness
@@ -112,7 +174,14 @@ def ebeam(
         ),
         pf.ExtrusionSpec(pf.MaskSpec([(201, 0), (203, 0)]), opening, (-pf.Z_INF, pf.Z_INF)),
     ]
+    return extrusion_specs
+
 
+def _port_specs(
+    *,
+    sin_thickness: pft.PositiveDimension,
+) -> dict[str, pf.PortSpec]:
+    # Port specification phase of the technology creation, timed as its own stage
     ports = {
         "SiN_TE_895_450": pf.PortSpec(
             description="SiN Strip TE 895 nm, w=450 nm",
@@ -216,7 +285,140 @@ def ebeam(
             path_profiles=((3.0, 0.0, (4, 0)),),
         ),
     }
+    return ports
+
+
+@_memoize
+@pf.parametric_technology
+def ebeam(
+    *,
+    sin_thickness: pft.PositiveDimension = 0.400,
+    sin_mask_dilation: pft.Coordinate = 0.0,
+    sidewall_angle: pft.Angle = 0.0,
+    heater_thickness: pft.PositiveDimension = 0.2,
+    router_thickness: pft.PositiveDimension = 0.6,
+    bottom_oxide_thickness: pft.PositiveDimension = 4.5,
+    top_oxide_thickness: pft.PositiveDimension = 3.0,
+    passivation_oxide_thickness: pft.PositiveDimension = 0.3,
+    sio2: dict[str, pft.Medium] = _sio2,
+    si: dict[str, pft.Medium] = _si,
+    sin: dict[str, pft.Medium] = _sin,
+    router_metal: dict[str, pft.Medium] = _router,
+    heater_metal: dict[str, pft.Medium] = _heater,
+    opening: pft.Medium = _open,
+) -> pf.Technology:
+    """Create a technology for the e-beam SiN PDK.
+
+    Args:
+        sin_thickness: SiN layer thickness.
+        sin_mask_dilation: Mask dilation for the SiN layer.
+        sidewall_angle: Sidewall angle (in degrees) for SiN etching.
+        heater_thickness: Thickness of the heater metal layer.
+        router_thickness: Thickness of the routing metal bilayer.
+        bottom_oxide_thickness: Thickness of the bottom oxide clad.
+        top_oxide_thickness: Thickness of the top oxide clad, measured from
+          the substrate.
+        passivation_oxide_thickness: Thickness of oxide above metal layers.
+        sio2: Background medium.
+        si: Silicon medium.
+        sin: Silicon nitride medium.
+        router_metal: Routing metal medium.
+        heater_metal: Heater metal medium.
+        opening: Medium for openings.
+
+    Returns:
+        Technology: E-Beam PDK technology definition.
+
+    Note:
+        Technologies are memoized based on the keyword arguments, so calling
+        this function repeatedly with the same parameters returns copies of
+        the same cached technology, which can be modified independently.
+        The cache can be skipped with ``use_parametric_cache=False``,
+        inspected with ``ebeam.cache_info()`` and emptied with
+        ``ebeam.cache_clear()``.
+    """
+
+    with stage("ebeam.layer_copy"):
+        layers = {k: v.copy() for k, v in _layers.items()}
+
+    with stage("ebeam.extrusion"):
+        extrusion_specs = _extrusion_specs(
+            sin_thickness=sin_thickness,
+            sin_mask_dilation=sin_mask_dilation,
+            sidewall_angle=sidewall_angle,
+            heater_thickness=heater_thickness,
+            router_thickness=router_thickness,
+            bottom_oxide_thickness=bottom_oxide_thickness,
+            top_oxide_thickness=top_oxide_thickness,
+            passivation_oxide_thickness=passivation_oxide_thickness,
+            sio2=sio2,
+            si=si,
+            sin=sin,
+            router_metal=router_metal,
+            heater_metal=heater_metal,
+            opening=opening,
+        )
+
+    with stage("ebeam.port_specs"):
+        ports = _port_specs(sin_thickness=sin_thickness)
 
     result = pf.Technology("SiEPIC EBeam SiN", "1.2.2", layers, extrusion_specs, ports, opening)
     result.random_variables = []
     return result
+
+
+def precompute_port_modes(
+    frequencies: Sequence[float],
+    technology: pf.Technology | None = None,
+    port_names: list[str] | None = None,
+    mesh_refinement: float | None = None,
+    max_workers: int | None = None,
+    verbose: bool = False,
+) -> dict[str, ModeSolver]:
+    """Solve the modes of the technology port specifications in parallel.
+
+    Mode solutions are stored in the Tidy3D local simulation cache
+    (configured in ``tidy3d.config.local_cache``), which is keyed by the
+    contents of the mode solver: the port specification, the technology
+    media and the frequency grid. Later solutions of the same ports, in
+    this or other processes, are loaded from that cache instead of running
+    the solver again, so calling this function once warms the cache for all
+    components using this technology.
+
+    Args:
+        frequencies: Frequency values for the mode solver.
+        technology: Technology with the port specifications. If ``None``,
+          the default :func:`ebeam` technology is used.
+        port_names: Names of the port specifications to solve. If ``None``,
+          all ports in the technology are used.
+        mesh_refinement: Minimal number of mesh elements per wavelength used
+          for mode solving.
+        max_workers: Maximal number of concurrent mode solver runs. If
+          ``None``, the default from
+          :class:`concurrent.futures.ThreadPoolExecutor` is used.
+        verbose: Flag controlling solver verbosity.
+
+    Returns:
+        dict[str, ModeSolver]: Mode solvers with calculated ``data``, indexed
+        by port specification name.
+    """
+    if technology is None:
+        technology = ebeam()
+
+    names = sorted(technology.ports) if port_names is None else list(dict.fromkeys(port_names))
+    missing = [n for n in names if n not in technology.ports]
+    if len(missing) > 0:
+        raise ValueError(f"Port specifications not found in the technology: {', '.join(missing)}.")
+
+    def solve(name):
+        return pf.port_modes(
+            technology.ports[name],
+            frequencies,
+            mesh_refinement,
+            technology=technology,
+            verbose=verbose,
+            show_progress=False,
+        )
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        return dict(zip(names, executor.map(solve, names), strict=True))
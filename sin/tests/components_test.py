@@ -1,3 +1,10 @@
+import importlib
+import warnings
+
+import numpy
+import photonforge as pf
+import pytest
+
 import siepic_sin_forge as siepic
 
 
@@ -5,3 +12,215 @@ def test_components():
     technology = siepic.ebeam()
     for name in siepic.component_names:
         _ = siepic.component(name, technology=technology)
+
+
+def test_components_bulk():
+    technology = siepic.ebeam()
+    components = siepic.components(technology=technology, max_workers=4)
+    assert set(components) == siepic.component_names
+    for name, c in components.items():
+        reference = siepic.component(name, technology=technology)
+        assert c.name == name
+        assert sorted(c.ports) == sorted(reference.ports)
+        assert sorted(c.models) == sorted(reference.models)
+
+
+def test_layout_cache():
+    technology = siepic.ebeam()
+    siepic.clear_cache()
+    c0 = siepic.component("ebeam_MMI_2x2_5050_te1310", technology=technology)
+    c1 = siepic.component("ebeam_YBranch_te1310", technology=technology)
+    # Each cell is read partially from the multi-cell library file
+    info = siepic.cache_info()
+    assert info.misses == 2
+    assert info.hits == 0
+    assert info.currsize == 2
+
+    c2 = siepic.component("ebeam_MMI_2x2_5050_te1310", technology=technology)
+    assert c2 is not c0
+    c0.remove_port("P0")
+    assert "P0" in c2.ports
+    assert c1.name == "ebeam_YBranch_te1310"
+
+    siepic.clear_cache()
+    assert siepic.cache_info().currsize == 0
+
+
+def test_component_cache():
+    technology = siepic.ebeam()
+    siepic.clear_cache()
+    shared = siepic.component("ebeam_YBranch_895", technology=technology, shared=True)
+    assert siepic.component("ebeam_YBranch_895", technology=technology, shared=True) is shared
+
+    c = siepic.component("ebeam_YBranch_895", technology=technology)
+    assert c is not shared
+    c.remove_port("P0")
+    assert "P0" in shared.ports
+
+    info = siepic.cache_info("component")
+    assert info.hits == 2
+    assert info.misses == 1
+    assert siepic.cache_info("layout").misses == 1
+
+    run_time = siepic.component("ebeam_YBranch_895", technology, {"run_time": 1e-12}, shared=True)
+    assert run_time is not shared
+    assert run_time.models["Tidy3D"].run_time == 1e-12
+    assert siepic.cache_info("component").currsize == 2
+
+    siepic.cache_capacity(1, "component")
+    assert siepic.cache_info("component").currsize == 1
+    siepic.cache_capacity(256, "component")
+    siepic.clear_cache()
+
+
+def test_component_cache_technology_changes():
+    technology = siepic.ebeam()
+    siepic.clear_cache()
+    c = siepic.component("ebeam_YBranch_895", technology=technology, shared=True)
+
+    # An equal technology instance shares the cached entry
+    other = siepic.ebeam(use_parametric_cache=False)
+    assert other is not technology
+    c_other = siepic.component("ebeam_YBranch_895", technology=other, shared=True)
+    assert c_other.technology is other
+    assert siepic.cache_info("component").hits == 1
+
+    # Changes in place are not served from stale entries
+    name = technology.name
+    try:
+        technology.name = name + " (modified)"
+        siepic.component("ebeam_YBranch_895", technology=technology, shared=True)
+        assert siepic.cache_info("component").misses == 2
+    finally:
+        technology.name = name
+    assert siepic.component("ebeam_YBranch_895", technology=technology, shared=True) is c
+    siepic.clear_cache()
+
+
+def test_component_copies_dependencies():
+    technology = siepic.ebeam()
+    siepic.clear_cache()
+    c = siepic.component("ebeam_BondPad", technology=technology)
+    (dependency,) = c.dependencies()
+    count = len(dependency.structures[(12, 0)])
+    dependency.add((12, 0), pf.Rectangle((0, 0), (1, 1)))
+
+    # Changes to the dependencies of a returned copy do not reach the cache
+    (dependency,) = siepic.component("ebeam_BondPad", technology=technology).dependencies()
+    assert len(dependency.structures[(12, 0)]) == count
+
+    # Replacing the technology does not modify the dependencies of the cached component
+    other = siepic.ebeam(use_parametric_cache=False)
+    (dependency,) = siepic.component("ebeam_BondPad", technology=other).dependencies()
+    assert dependency.technology is other
+    shared = siepic.component("ebeam_BondPad", technology=technology, shared=True)
+    assert shared.dependencies()[0].technology is technology
+    siepic.clear_cache()
+
+
+def test_bundle(tmp_path, monkeypatch):
+    module = importlib.import_module("siepic_sin_forge.component")
+    technology = siepic.ebeam()
+    bundle = tmp_path / "components.phf"
+    siepic.write_bundle(bundle, technology)
+
+    monkeypatch.setattr(module, "_bundle_path", bundle)
+    siepic.clear_cache()
+    c = siepic.component("ebeam_YBranch_895", technology=technology)
+    reference = siepic.component("ebeam_YBranch_895", technology=technology, use_bundle=False)
+    assert siepic.cache_info().misses == 1
+    assert c.technology is technology
+    assert c.ports == reference.ports
+    assert c.models == reference.models
+    assert c.properties.__thumbnail__ == reference.properties.__thumbnail__
+
+    # Model arguments are applied in the same way as for components loaded from GDS
+    c = siepic.component("ebeam_YBranch_895", technology, {"run_time": 1e-12})
+    reference = siepic.component(
+        "ebeam_YBranch_895", technology, {"run_time": 1e-12}, use_bundle=False
+    )
+    assert c.models == reference.models
+    assert c.models["Tidy3D"].bounds is not None
+
+    # Different technology: fall back to GDS
+    other = siepic.ebeam(sidewall_angle=5)
+    c = siepic.component("ebeam_YBranch_895", technology=other)
+    assert siepic.cache_info().misses == 2
+
+    # Stale bundle: fall back to GDS
+    monkeypatch.setattr(module, "_library_digest", lambda: "stale")
+    siepic.clear_cache()
+    c = siepic.component("ebeam_YBranch_895", technology=technology)
+    assert siepic.cache_info().misses == 1
+    siepic.clear_cache()
+
+
+def test_bundle_unreadable(tmp_path, monkeypatch):
+    module = importlib.import_module("siepic_sin_forge.component")
+    technology = siepic.ebeam()
+    bundle = tmp_path / "components.phf"
+    siepic.write_bundle(bundle, technology)
+    data = bundle.read_bytes()
+    monkeypatch.setattr(module, "_bundle_path", bundle)
+    reference = siepic.component("ebeam_YBranch_895", technology=technology, use_bundle=False)
+
+    for size in (16, len(data) // 2, len(data) - 10):
+        bundle.write_bytes(data[:size])
+        siepic.clear_cache()
+        with pytest.warns(RuntimeWarning, match="could not be read"):
+            c = siepic.component("ebeam_YBranch_895", technology=technology)
+        assert c.ports == reference.ports
+        assert c.models == reference.models
+
+        # The bundle stays disabled: no more warnings
+        with warnings.catch_warnings():
+            warnings.filterwarnings("error", "Library bundle", RuntimeWarning)
+            c = siepic.component("ebeam_YBranch_895", technology, {"run_time": 1e-12})
+    siepic.clear_cache()
+
+
+def test_data_model(monkeypatch, tmp_path):
+    component_module = importlib.import_module("siepic_sin_forge.component")
+    cache_module = importlib.import_module("siepic_sin_forge.s_matrix_cache")
+    monkeypatch.setattr(component_module, "_data_path", tmp_path)
+    siepic.clear_cache()
+
+    technology = siepic.ebeam()
+    reference = siepic.component("ebeam_YBranch_te1310", technology=technology)
+    frequencies = pf.C_0 / numpy.linspace(1.26, 1.36, 11)
+    elements = {
+        (f"{i}@0", f"{j}@0"): numpy.full(11, 0.5 if i != j else 0.0)
+        for i in reference.ports
+        for j in reference.ports
+    }
+    cache_module._write_s_matrix(
+        tmp_path / "ebeam_YBranch_te1310.npz", pf.SMatrix(frequencies, elements, reference.ports)
+    )
+
+    c = siepic.component("ebeam_YBranch_te1310", technology=technology, model="data")
+    assert isinstance(c.active_model, pf.DataModel)
+    assert "Tidy3D" in c.models
+    s_matrix = c.s_matrix(pf.C_0 / numpy.array([1.29, 1.33]))
+    assert numpy.allclose(s_matrix["P0@0", "P1@0"], 0.5)
+
+    with pytest.warns(RuntimeWarning, match="Tabulated data not available"):
+        c = siepic.component("ebeam_MMI_2x2_5050_te1310", technology=technology, model="data")
+    assert isinstance(c.active_model, pf.Tidy3DModel)
+
+    with pytest.raises(ValueError):
+        siepic.component("ebeam_YBranch_te1310", technology=technology, model="eme")
+    siepic.clear_cache()
+
+
+def test_simulation_bounds():
+    technology = siepic.ebeam()
+    c = siepic.component("taper_SiN_750_3000", technology=technology)
+    (x_min, y_min, z_min), (x_max, y_max, z_max) = c.models["Tidy3D"].bounds
+    assert x_min is None and x_max is None
+    assert y_min <= -1.5 and y_max >= 1.5
+    assert z_min is not None and z_max is not None
+
+    bounds = ((None, -5, None), (None, 5, None))
+    c = siepic.component("taper_SiN_750_3000", technology, {"bounds": bounds})
+    assert c.models["Tidy3D"].bounds == bounds
+    siepic.clear_cache()
@@ -0,0 +1,36 @@
+import matplotlib
+import numpy
+
+import siepic_sin_forge as siepic
+
+matplotlib.use("Agg")
+
+
+def core(stack):
+    # The SiN extrusion is the second to last in the stack
+    _, vertices = stack[-2]
+    return vertices
+
+
+def test_cross_section():
+    technology = siepic.ebeam()
+    (stack,) = siepic.cross_section.cross_section(technology)
+    assert len(stack) == len(technology.extrusion_specs)
+    vertices = core(stack)
+    assert len(vertices) == 2
+    assert numpy.allclose(vertices[0, :, 0], [-0.5, 1, 1, -0.5])
+    assert numpy.allclose(vertices[0, :, 1], [0, 0, 0.4, 0.4])
+
+    variants = [siepic.ebeam(sin_mask_dilation=0.01), siepic.ebeam(sidewall_angle=10)]
+    dilated, angled = siepic.cross_section.cross_section(variants)
+    assert numpy.allclose(core(dilated)[0, :, 0], [-0.51, 1.01, 1.01, -0.51])
+    top = core(angled)[0, 2:, 0]
+    assert top[1] - top[0] < 1.5
+
+
+def test_plot_cross_section():
+    variants = [siepic.ebeam(sin_thickness=t) for t in numpy.linspace(0.38, 0.42, 50)]
+    ax = siepic.plot_cross_section(variants)
+    assert len(ax.collections) == 1
+    ax = siepic.plot_cross_section()
+    assert ax.get_title() == siepic.ebeam().name
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import pathlib
+import shutil
+
+import siepic_sin_forge as siepic
+from siepic_sin_forge import gds_index
+
+library = pathlib.Path(siepic.__file__).parent / "library"
+
+
+def test_build_index():
+    index = gds_index.build_index(library / "ULaval.gds")
+    data = (library / "ULaval.gds").read_bytes()
+    assert index["size"] == len(data)
+    assert "ebeam_YBranch_te1310" in index["cells"]
+    for name, cell in index["cells"].items():
+        assert data[cell["start"] + 2] == gds_index._BGNSTR
+        assert data[cell["end"] - 2] == gds_index._ENDSTR
+        assert name.encode() in data[cell["start"] : cell["end"]]
+
+
+def test_index_up_to_date():
+    gds_index.clear_index()
+    index = gds_index._load_index()
+    assert set(index) == {p.stem for p in library.glob("*.gds")}
+    for libname, entry in index.items():
+        assert entry == gds_index.build_index(library / (libname + ".gds"))
+
+
+def test_read_cell(tmp_path):
+    gds_index.clear_index()
+    names = gds_index.library_cells("ULaval")
+    closure = gds_index.cell_closure("ULaval", "ebeam_YBranch_te1310")
+    assert set(closure) < set(names)
+    assert "ebeam_YBranch_te1310" in closure
+
+    stream = gds_index.read_cell("ULaval", "ebeam_YBranch_te1310")
+    assert len(stream) < (library / "ULaval.gds").stat().st_size
+    partial = tmp_path / "partial.gds"
+    partial.write_bytes(stream)
+    assert list(gds_index.build_index(partial)["cells"]) == closure
+
+    assert gds_index.read_cell("ULaval", "missing") is None
+    assert gds_index.read_cell("missing", "ebeam_YBranch_te1310") is None
+
+
+def test_read_cell_modified_library(tmp_path, monkeypatch):
+    gds_index.clear_index()
+    data = bytearray((library / "ULaval.gds").read_bytes())
+    cells = gds_index._load_index()["ULaval"]["cells"]
+
+    # Same size, different contents in a cell that is not read
+    other = cells["ebeam_MMI_2x2_5050_te1310"]
+    data[other["end"] - 5] ^= 0xFF
+    (tmp_path / "ULaval.gds").write_bytes(data)
+    monkeypatch.setattr(gds_index, "_library_path", tmp_path)
+    assert gds_index.read_cell("ULaval", "ebeam_YBranch_te1310") is None
+
+    gds_index.clear_index()
+
+
+def test_read_cell_verification(tmp_path, monkeypatch):
+    shutil.copy(library / "ULaval.gds", tmp_path / "ULaval.gds")
+    monkeypatch.setattr(gds_index, "_library_path", tmp_path)
+    monkeypatch.setattr(gds_index, "_verified_path", tmp_path / "cache" / "verified.json")
+    gds_index.clear_index()
+
+    hashed = []
+    sha256 = hashlib.sha256
+    monkeypatch.setattr(hashlib, "sha256", lambda data=b"": hashed.append(1) or sha256(data))
+
+    assert gds_index.read_cell("ULaval", "ebeam_YBranch_te1310") is not None
+    assert len(hashed) == 1
+
+    # New sessions use the stored verification instead of hashing the file again
+    gds_index.clear_index()
+    assert gds_index.read_cell("ULaval", "ebeam_YBranch_te1310") is not None
+    assert len(hashed) == 1
+
+    # Changed metadata triggers a new verification
+    stat = (tmp_path / "ULaval.gds").stat()
+    os.utime(tmp_path / "ULaval.gds", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    gds_index.clear_index()
+    assert gds_index.read_cell("ULaval", "ebeam_YBranch_te1310") is not None
+    assert len(hashed) == 2
+
+    gds_index.clear_index()
@@ -0,0 +1,60 @@
+import numpy
+import photonforge as pf
+import pytest
+
+import siepic_sin_forge as siepic
+
+
+def linear_solver(component, frequencies):
+    # Stand-in solver with magnitude and phase that vary linearly with the SiN thickness
+    t = component.technology.parametric_kwargs["sin_thickness"]
+    ports = sorted(component.ports)
+    pairs = [(i, j) for i in ports for j in ports]
+    elements = {
+        (f"{i}@0", f"{j}@0"): numpy.full(len(frequencies), t * numpy.exp(1j * k * t))
+        for k, (i, j) in enumerate(pairs)
+    }
+    return pf.SMatrix(frequencies, elements, component.ports)
+
+
+def test_grid_model(tmp_path):
+    frequencies = pf.C_0 / numpy.linspace(1.5, 1.6, 5)
+    grid = {"sin_thickness": [0.41, 0.39, 0.40]}
+    model = siepic.build_grid_model(
+        "ebeam_YBranch_895", grid, frequencies, output=tmp_path, solver=linear_solver
+    )
+    assert list(model.grid["sin_thickness"]) == [0.39, 0.40, 0.41]
+    assert model.error_estimate["sin_thickness"] < 1e-12
+
+    c = siepic.component("ebeam_YBranch_895", siepic.ebeam(sin_thickness=0.397))
+    c.add_model(model, "Grid")
+    s_matrix = c.s_matrix(frequencies)
+    assert numpy.allclose(s_matrix["P0@0", "P0@0"].real, 0.397)
+
+    fixed = siepic.ProcessGridModel(
+        model.grid, model.frequencies, model.names, model.values, {"sin_thickness": 0.405}
+    )
+    elements = fixed.interpolate(frequencies[::2], fixed.parameters)
+    assert numpy.allclose(elements[("P0@0", "P0@0")].real, 0.405)
+
+    with pytest.warns(RuntimeWarning, match="outside of the model grid"):
+        model.interpolate(frequencies, {"sin_thickness": 0.3})
+
+    model.save(tmp_path / "model.npz")
+    loaded = siepic.ProcessGridModel.load(tmp_path / "model.npz")
+    assert loaded.names == model.names
+    assert numpy.array_equal(loaded.values, model.values)
+
+
+def test_grid_model_phase():
+    # Phase rotation between nodes larger than what linear complex interpolation handles
+    frequencies = numpy.array([1.9e14, 2.0e14])
+    phases = numpy.array([0.0, 2.5, 5.0])
+    values = numpy.exp(1j * phases)[:, None, None] * numpy.array([[1.0, 0.5]])
+    model = siepic.ProcessGridModel(
+        {"thickness": [0.1, 0.2, 0.3]}, frequencies, [("P0@0", "P1@0")], values
+    )
+    assert model.error_estimate["thickness"] < 1e-12
+
+    elements = model.interpolate(frequencies, {"thickness": 0.15})
+    assert numpy.allclose(elements[("P0@0", "P1@0")], [numpy.exp(1.25j), 0.5 * numpy.exp(1.25j)])
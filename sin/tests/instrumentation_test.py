@@ -0,0 +1,107 @@
+import csv
+import json
+import subprocess
+import sys
+
+import siepic_sin_forge as siepic
+from siepic_sin_forge import instrumentation
+
+
+def test_disabled():
+    assert instrumentation.stage("test") is instrumentation.stage("other")
+
+
+def test_profile(tmp_path):
+    with instrumentation.profile() as stats:
+        for _ in range(3):
+            with instrumentation.stage("test"):
+                pass
+    with instrumentation.stage("test"):
+        pass
+
+    summary = stats.summary()
+    assert list(summary) == ["test"]
+    assert summary["test"]["count"] == 3
+    assert summary["test"]["min"] <= summary["test"]["mean"] <= summary["test"]["max"]
+
+    stats.write_json(tmp_path / "stats.json")
+    assert json.loads((tmp_path / "stats.json").read_text()) == summary
+
+    stats.write_csv(tmp_path / "stats.csv")
+    with (tmp_path / "stats.csv").open() as file:
+        rows = list(csv.DictReader(file))
+    assert [row["stage"] for row in rows] == ["test"]
+    assert int(rows[0]["count"]) == 3
+
+
+def test_custom_collector():
+    class Recorder:
+        def __init__(self):
+            self.stages = []
+
+        def record(self, stage, duration):
+            self.stages.append(stage)
+
+    recorder = Recorder()
+    instrumentation.add_collector(recorder)
+    try:
+        with instrumentation.stage("test"):
+            pass
+    finally:
+        instrumentation.remove_collector(recorder)
+    with instrumentation.stage("test"):
+        pass
+    assert recorder.stages == ["test"]
+
+
+def test_component_stages():
+    siepic.clear_cache()
+    siepic.ebeam.cache_clear()
+    with instrumentation.profile() as stats:
+        technology = siepic.ebeam()
+        siepic.component("ebeam_YBranch_895", technology=technology, use_bundle=False)
+    summary = stats.summary()
+    for stage in (
+        "component",
+        "component.gds_load",
+        "component.label_strip",
+        "component.ports",
+        "component.model",
+        "ebeam",
+        "ebeam.layer_copy",
+        "ebeam.extrusion",
+        "ebeam.port_specs",
+    ):
+        assert summary[stage]["count"] == 1
+    siepic.clear_cache()
+
+
+_stages_script = """
+import sys
+import siepic_sin_forge
+from siepic_sin_forge import instrumentation
+
+with instrumentation.profile() as stats:
+    technology = siepic_sin_forge.ebeam()
+    siepic_sin_forge.component("ebeam_YBranch_895", technology=technology, use_bundle=False)
+missing = set(sys.argv[1:]) - set(stats.summary())
+assert len(missing) == 0, missing
+"""
+
+
+def test_all_stages():
+    # The metal media are created when the technology module is imported, so the collector must
+    # be registered before that, in a new process
+    stages = [
+        "component",
+        "component.gds_load",
+        "component.label_strip",
+        "component.ports",
+        "component.model",
+        "ebeam",
+        "ebeam.layer_copy",
+        "ebeam.materials",
+        "ebeam.extrusion",
+        "ebeam.port_specs",
+    ]
+    subprocess.run([sys.executable, "-c", _stages_script, *stages], check=True)
@@ -0,0 +1,174 @@
+import importlib.util
+import json
+import pathlib
+import threading
+
+import photonforge as pf
+import pytest
+
+import siepic_sin_forge as siepic
+
+root = pathlib.Path(__file__).parent.parent
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("make_pda_library", root / "make_pda_library.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class LocalProject:
+    """Stand-in for a PDA project that records the added objects and config updates."""
+
+    def __init__(self, project_id, module_path):
+        self.id = project_id
+        self.module_path = module_path
+        self.module_name = "siepic_local"
+        self.fail_after = None
+        self.added = []
+        self.technologies = []
+        self.config_updates = 0
+        self.versions = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def add(self, component, update_existing_dependencies=True, update_config=True):
+        if update_config:
+            self.config_updates += 1
+        if isinstance(component, pf.Technology):
+            self.technologies.append(component)
+            return
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            if self.fail_after is not None and len(self.added) >= self.fail_after:
+                self.active -= 1
+                raise ConnectionError("Upload failed")
+        self.added.append((component, update_config))
+        with self.lock:
+            self.active -= 1
+
+    def save_module(self):
+        pass
+
+    def import_module(self, namespace):
+        return {self.module_name: siepic}
+
+    def add_version(self, version):
+        self.versions.append(version)
+
+
+class LocalPDA:
+    """Stand-in for the ``photonforge.pda`` API."""
+
+    def __init__(self, module_path):
+        self.module_path = module_path
+        self.projects = []
+
+    def list_libraries(self, name):
+        return [{"name": name, "version": v} for p in self.projects for v in p.versions]
+
+    def create_project(self, name, **kwargs):
+        project = LocalProject(len(self.projects), self.module_path)
+        self.projects.append(project)
+        return project
+
+    def load_project(self, project_id):
+        return self.projects[project_id]
+
+
+def test_create_library(monkeypatch, tmp_path):
+    script = load_script()
+    monkeypatch.chdir(root)
+    monkeypatch.setattr(pf.config, "default_technology", pf.config.default_technology)
+    api = LocalPDA(tmp_path)
+
+    state_file = tmp_path / "state.json"
+    script.create_library(api, batch_size=3, max_workers=2, state_file=state_file)
+    assert len(api.projects) == 1
+    project = api.projects[0]
+    assert project.versions == [siepic.ebeam().version]
+    assert project.max_active <= 2
+
+    names = [c.name for c, _ in project.added]
+    assert sorted(names) == sorted(siepic.component_names)
+    assert not any(update_config for _, update_config in project.added)
+    assert project.config_updates == 1
+    assert [t.name for t in project.technologies] == [siepic.ebeam().name]
+    assert all(
+        type(c.models.get("Tidy3D", pf.Tidy3DModel())) is pf.Tidy3DModel for c, _ in project.added
+    )
+
+    module_dir = tmp_path / project.module_name
+    assert sorted(p.stem for p in module_dir.iterdir()) == sorted(script.published_modules)
+    init = (module_dir / "__init__.py").read_text()
+    assert "_component_data" not in init
+    assert '".component"' not in init
+    assert '"s_matrix_cache"' not in init
+    assert '"ebeam": ".technology"' in init
+
+    # Existing versions are not published again
+    script.create_library(api, state_file=state_file)
+    assert len(api.projects) == 1
+
+    state = json.loads(state_file.read_text())
+    assert state["project"] == project.id
+    assert sorted(state["published"]["components"]) == sorted(siepic.component_names)
+    assert state["pending"] == {}
+
+
+def test_delta_publish(monkeypatch, tmp_path):
+    script = load_script()
+    monkeypatch.chdir(root)
+    monkeypatch.setattr(pf.config, "default_technology", pf.config.default_technology)
+    api = LocalPDA(tmp_path)
+    state_file = tmp_path / "state.json"
+    script.create_library(api, state_file=state_file, version="1")
+    project = api.projects[0]
+    total = len(project.added)
+
+    # Unchanged library: only the version is added, but the config is still written
+    project.added.clear()
+    script.create_library(api, state_file=state_file, version="2")
+    assert len(api.projects) == 1
+    assert project.added == []
+    assert project.config_updates == 2
+    assert project.versions == ["1", "2"]
+
+    # Changed component
+    state = json.loads(state_file.read_text())
+    changed = min(state["published"]["components"])
+    state["published"]["components"][changed] = ""
+    state_file.write_text(json.dumps(state))
+    script.create_library(api, state_file=state_file, version="3")
+    assert [c.name for c, _ in project.added] == [changed]
+
+    # Interrupted publish resumes from the checkpoint
+    project.added.clear()
+    state_file.write_text(json.dumps({"project": project.id}))
+    project.fail_after = 5
+    with pytest.raises(ConnectionError):
+        script.create_library(api, batch_size=2, max_workers=2, state_file=state_file, version="4")
+    uploaded = {c.name for c, _ in project.added}
+    assert set(json.loads(state_file.read_text())["pending"]["components"]) == uploaded
+    assert project.versions == ["1", "2", "3"]
+
+    project.fail_after = None
+    project.added.clear()
+    script.create_library(api, state_file=state_file, version="4")
+    assert project.versions == ["1", "2", "3", "4"]
+    assert len(project.added) == total - len(uploaded)
+    assert uploaded.isdisjoint(c.name for c, _ in project.added)
+
+
+def test_component_digest():
+    script = load_script()
+    name = "ebeam_YBranch_te1310"
+    digest = script.component_digest(siepic.component(name, siepic.ebeam()))
+    assert script.component_digest(siepic.component(name, siepic.ebeam())) == digest
+
+    # Technology changes that keep the geometry are detected
+    variant = siepic.ebeam(top_oxide_thickness=2.5)
+    assert script.component_digest(siepic.component(name, variant)) != digest
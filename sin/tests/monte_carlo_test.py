@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import siepic_sin_forge as siepic
+
+
+def port_count(components, parameters):
+    return {name: len(c.ports) for name, c in components.items()}
+
+
+def test_draw_samples():
+    # No random variables are declared in the technology
+    assert siepic.monte_carlo.draw_samples(5, seed=1) == [{}] * 5
+
+
+def test_run(tmp_path):
+    output = tmp_path / "results.jsonl"
+    summary = siepic.monte_carlo.run(
+        port_count, ["ebeam_YBranch_te1310"], 10, output, seed=0, max_workers=2
+    )
+    assert summary.samples == 10
+    assert summary.evaluations == 1
+
+    records = list(siepic.monte_carlo.load_results(output))
+    assert [r["sample"] for r in records] == list(range(10))
+    assert all(r["result"] == {"ebeam_YBranch_te1310": 3} for r in records)
+
+
+def test_bounded_map():
+    lock = threading.Lock()
+    submitted = []
+    consumed = []
+
+    def square(x):
+        with lock:
+            submitted.append(x)
+        return x * x
+
+    with ThreadPoolExecutor(2) as executor:
+        for result in siepic.monte_carlo._bounded_map(executor, square, range(20), 3):
+            consumed.append(result)
+            with lock:
+                assert len(submitted) <= len(consumed) + 3
+    assert consumed == [x * x for x in range(20)]
@@ -0,0 +1,51 @@
+import numpy
+import photonforge as pf
+import pytest
+
+import siepic_sin_forge as siepic
+
+
+def test_route_polygons():
+    technology = siepic.ebeam()
+    waypoints = numpy.zeros((3, 2, 2))
+    waypoints[:, 1, 0] = 10
+    waypoints[:, :, 1] = numpy.arange(3)[:, None] * 5
+
+    layers = siepic.route_polygons(waypoints, "SiN_TE_1550_750", technology)
+    assert set(layers) == {(4, 0)}
+    assert len(layers[(4, 0)]) == 3
+    (x_min, y_min), (x_max, y_max) = layers[(4, 0)][1].bounds()
+    assert numpy.allclose((x_min, y_min, x_max, y_max), (0, 4.625, 10, 5.375))
+
+    with pytest.raises(ValueError):
+        siepic.route_polygons(waypoints, "Unknown", technology)
+
+
+def test_route_bends():
+    technology = siepic.ebeam()
+    routes = [
+        [(0, 0), (10, 0), (10, 10)],
+        [(0, 20), (10, 20), (20, 20), (20, 10)],
+        [(0, -10), (20, -10)],
+    ]
+    layers = siepic.route_polygons(routes, "SiN_TE_1550_750", technology, radius=5)
+    polygons = layers[(4, 0)]
+    assert len(polygons) == 3
+
+    vertices = numpy.asarray(polygons[0].vertices)
+    distance = numpy.linalg.norm(vertices - (5, 5), axis=1)
+    bend = (vertices[:, 0] > 5 + 1e-6) & (vertices[:, 1] < 5 - 1e-6)
+    assert numpy.all(distance[bend] > 4.625 - 1e-3)
+    assert numpy.all(distance[bend] < 5.375 + 1e-3)
+    assert numpy.allclose(polygons[1].bounds(), ((0, 10), (20.375, 20.375)), atol=1e-3)
+
+    with pytest.raises(ValueError):
+        siepic.route_polygons(routes, "SiN_TE_1550_750", technology, radius=15)
+
+    # Outer profile edges must not cross the bend center
+    with pytest.raises(ValueError, match="extent"):
+        siepic.route_polygons(routes, "MM_SiN_TE_1550_3000", technology, radius=1)
+
+    c = pf.Component("Routes", technology)
+    siepic.add_routes(c, routes, "SiN_TE_1550_750", radius=5)
+    assert len(c.get_structures()[(4, 0)]) == 3
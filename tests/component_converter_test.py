@@ -0,0 +1,101 @@
+import ast
+import importlib
+
+import photonforge as pf
+
+import component_converter
+
+
+def _cell(name, technology):
+    data = importlib.import_module("siepic_forge._component_data")._component_data
+    libname, ports, _, _ = data[name]
+    components = pf.load_layout(
+        f"si/siepic_forge/library/{libname}.gds", technology=technology
+    )
+    comp = components[name]
+    comp.remap_layers({(1, 99): (1, 0)})
+    return comp, ports
+
+
+def test_detect_port_symmetries():
+    technology = component_converter.siepic_si.ebeam()
+
+    comp, ports = _cell("ebeam_y_1550", technology)
+    assert component_converter.detect_port_symmetries(comp, ports, technology) == [
+        ("P1", "P2", {"P0": "P0", "P2": "P1"})
+    ]
+
+    # Symmetries in the generated entry use the curated ports of the cell
+    curated = [ports[1], ports[0], ports[2]]
+    cells = component_converter.scan_library(
+        "si",
+        "si/siepic_forge/library/ebeam_y_1550.gds",
+        {},
+        {"ebeam_y_1550": curated},
+        {"ebeam_y_1550": "y-splitter"},
+    )
+    assert cells["ebeam_y_1550"]["model"] == repr(
+        {"port_symmetries": [("P0", "P2", {"P1": "P1", "P2": "P0"})]}
+    )
+    (entry,) = ast.literal_eval("{" + cells["ebeam_y_1550"]["line"] + "}").values()
+    assert entry[0] == "ebeam_y_1550"
+    assert entry[1] == curated
+    assert entry[3] == "y-splitter"
+
+    # Mirrored port placement with asymmetric arms
+    comp, ports = _cell("ebeam_bdc_te1550", technology)
+    assert component_converter.detect_port_symmetries(comp, ports, technology) == []
+
+
+def test_with_model():
+    entry = "'cell': ('lib', [((0.0, 0.0), 180, 'TE_1550_500')], {}, 'termination'),"
+    model = "{'port_symmetries': [('P1', 'P2', {'P0': 'P0', 'P2': 'P1'})]}"
+    assert component_converter.with_model(entry, model) == (
+        f"'cell': ('lib', [((0.0, 0.0), 180, 'TE_1550_500')], {model}, 'termination'),"
+    )
+    assert component_converter.with_model(entry, "{}") == entry
+
+    curated = entry.replace("{}", "{'port_symmetries': _symmetries_3port}")
+    assert component_converter.with_model(curated, model) == curated
+
+
+def test_stale_curated_ports():
+    _, ports = _cell("ebeam_y_1550", component_converter.siepic_si.ebeam())
+    stale = [((ports[0][0][0] + 1, ports[0][0][1]), *ports[0][1:]), *ports[1:]]
+    cells = component_converter.scan_library(
+        "si",
+        "si/siepic_forge/library/ebeam_y_1550.gds",
+        {},
+        {"ebeam_y_1550": stale},
+        {},
+    )
+    cell = cells["ebeam_y_1550"]
+    assert any("do not match" in warning for warning in cell["warnings"])
+    (entry,) = ast.literal_eval("{" + cell["line"] + "}").values()
+    assert stale[0] not in entry[1]
+    assert set(ports) <= set(entry[1])
+    assert entry[3] == ""
+
+
+def test_merge_entries():
+    entries = {
+        "listed": "'listed': ('lib', [((0.0, 0.0), 180, 'P')], {}, 'old'),",
+        "changed": "'changed': ('lib', [((0.0, 0.0), 180, 'P')], {}, 'old'),",
+    }
+    model = "{'port_symmetries': [('P0', 'P1', {})]}"
+    new_line = "'changed': ('lib', [((1.0, 0.0), 0, 'P')], {}, 'old'),"
+    cells = {
+        "listed": {"line": "", "model": model, "warnings": []},
+        "changed": {"line": new_line, "model": "{}", "warnings": [], "rescanned": True},
+        "new": {
+            "line": "'new': ('lib', [], None, ''),",
+            "model": "None",
+            "warnings": [],
+        },
+    }
+    assert component_converter.merge_entries(cells, entries) == [
+        component_converter.with_model(entries["listed"], model),
+        new_line,
+        "'new': ('lib', [], None, ''),",
+    ]
+    assert "rescanned" not in cells["changed"]
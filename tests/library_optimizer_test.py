@@ -0,0 +1,48 @@
+import numpy
+import photonforge as pf
+
+import library_optimizer
+
+
+def test_simplify_vertices():
+    # Square outline with collinear points and a small bump on one side
+    vertices = [
+        (0, 0),
+        (1, 0),
+        (2, 0.0005),
+        (3, 0),
+        (4, 0),
+        (4, 2),
+        (4, 4),
+        (0, 4),
+        (0, 2),
+    ]
+    simplified, deviation = library_optimizer.simplify_vertices(vertices, 0.001)
+    assert sorted(map(tuple, simplified.tolist())) == [(0, 0), (0, 4), (4, 0), (4, 4)]
+    assert 0 < deviation <= 0.001
+
+    # Deviations above the tolerance are kept
+    simplified, _ = library_optimizer.simplify_vertices(vertices, 0.0001)
+    assert [2, 0.0005] in simplified.tolist()
+
+
+def test_optimize_cell():
+    layers = {(1, 0)}
+
+    # Touching polygons are merged into a single simplified outline
+    comp = pf.Component("merge")
+    comp.add((1, 0), pf.Polygon([(0, 0), (1, 0), (2, 0), (2, 1), (0, 1)]))
+    comp.add((1, 99), pf.Polygon([(2, 0), (4, 0), (4, 1), (3, 1), (2, 1)]))
+    report = library_optimizer.optimize_cell(comp, layers, 0.001)
+    assert report == {"vertices_before": 10, "vertices_after": 4, "max_deviation": 0.0}
+    assert list(comp.structures) == [(1, 0)]
+    (polygon,) = comp.structures[(1, 0)]
+    assert numpy.allclose(polygon.bounds(), ((0, 0), (4, 1)))
+
+    # Cells that would not get fewer vertices are left unchanged
+    comp = pf.Component("unchanged")
+    original = pf.Polygon([(0, 0), (2, 0), (2, 1), (0, 1)])
+    comp.add((1, 0), original)
+    report = library_optimizer.optimize_cell(comp, layers, 0.001)
+    assert report["vertices_before"] == report["vertices_after"] == 4
+    assert comp.structures[(1, 0)] == [original]